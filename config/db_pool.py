@@ -0,0 +1,39 @@
+import time
+
+from django.db import connections
+
+_samples = {}
+
+
+#* per-alias connection pool stats for this process (psycopg_pool counters)
+def pool_stats():
+    stats = {}
+    for alias in connections:
+        pool = getattr(connections[alias], "pool", None)
+        if pool is None:
+            continue
+        raw = pool.get_stats()
+        now = time.monotonic()
+        checkouts = raw.get("requests_num", 0)
+        previous = _samples.get(alias)
+        _samples[alias] = (now, checkouts)
+
+        rate = None
+        if previous and now > previous[0]:
+            rate = round((checkouts - previous[1]) / (now - previous[0]), 2)
+        stats[alias] = {
+            "size": raw.get("pool_size", 0),
+            "min_size": raw.get("pool_min", 0),
+            "max_size": raw.get("pool_max", 0),
+            "available": raw.get("pool_available", 0),
+            "in_use": raw.get("pool_size", 0) - raw.get("pool_available", 0),
+            "waiting": raw.get("requests_waiting", 0),
+            "checkouts": checkouts,
+            "checkouts_per_sec": rate,
+            "waits": raw.get("requests_queued", 0),
+            "wait_ms": raw.get("requests_wait_ms", 0),
+            "errors": raw.get("requests_errors", 0),
+            "connections_opened": raw.get("connections_num", 0),
+            "connections_lost": raw.get("connections_lost", 0),
+        }
+    return stats
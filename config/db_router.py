@@ -0,0 +1,93 @@
+import random
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.core.cache import cache
+from rest_framework.permissions import SAFE_METHODS
+
+import logging
+
+logger = logging.getLogger(__name__)
+
+_read_alias = ContextVar("db_read_alias", default=None)
+_wrote = ContextVar("db_wrote", default=False)
+
+
+#* reads go to the alias chosen for the current request (default when unset)
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        return _read_alias.get()
+
+    def db_for_write(self, model, **hints):
+        _wrote.set(True)
+        return "default"
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db == "default"
+
+
+#* reads inside the block go to the primary whatever the request chose, for
+#* results that outlive the request (caches) and must not carry replica lag
+@contextmanager
+def read_from_primary():
+    token = _read_alias.set("default")
+    try:
+        yield
+    finally:
+        _read_alias.reset(token)
+
+
+def _pin_key(user_id):
+    return f"db:pin:{user_id}"
+
+
+#* read-your-writes: keep a user on the primary for a short window after a write
+def pin(user):
+    cache.set(_pin_key(user.pk), 1, timeout=settings.REPLICA_PIN_SECONDS)
+
+
+def is_pinned(user):
+    return user.is_authenticated and cache.get(_pin_key(user.pk)) is not None
+
+
+#* sends safe requests of a DRF view to a random replica unless the user is pinned
+class ReplicaReadMixin:
+    read_alias = "default"
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        if (
+            settings.DATABASE_REPLICAS
+            and request.method in SAFE_METHODS
+            and not is_pinned(request.user)
+        ):
+            self.read_alias = random.choice(settings.DATABASE_REPLICAS)
+            self._read_alias_token = _read_alias.set(self.read_alias)
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        token = getattr(self, "_read_alias_token", None)
+        if token is not None:
+            _read_alias.reset(token)
+            self._read_alias_token = None
+        return super().finalize_response(request, response, *args, **kwargs)
+
+
+#* pins the authenticated user after any request that wrote to the database
+class ReplicaPinMiddleware:
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        token = _wrote.set(False)
+        try:
+            response = self.get_response(request)
+            user = getattr(request, "user", None)
+            if _wrote.get() and user is not None and user.is_authenticated:
+                pin(user)
+        finally:
+            _wrote.reset(token)
+        return response
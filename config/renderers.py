@@ -0,0 +1,29 @@
+from rest_framework import renderers
+from rest_framework.utils import encoders
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover
+    orjson = None
+
+_encoder = encoders.JSONEncoder()
+
+
+#* compact UTF-8 JSON, same output as DRF's JSONRenderer defaults
+def dumps(data):
+    if orjson is not None:
+        return orjson.dumps(data, default=_encoder.default)
+    return renderers.JSONRenderer().render(data)
+
+
+#* JSONRenderer backed by orjson when it is installed
+class FastJSONRenderer(renderers.JSONRenderer):
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b""
+        #* indented output (browsable/pretty requests) goes through the stdlib encoder
+        if orjson is None or self.get_indent(
+            accepted_media_type, renderer_context or {}
+        ):
+            return super().render(data, accepted_media_type, renderer_context)
+        return orjson.dumps(data, default=_encoder.default)
@@ -1,5 +1,6 @@
 from pathlib import Path
 from datetime import timedelta
+import copy
 from django.core.cache import cache
 import os
 from dotenv import load_dotenv
@@ -19,6 +20,7 @@ INSTALLED_APPS = [
     "django.contrib.sessions",
     "django.contrib.messages",
     "django.contrib.staticfiles",
+    "django.contrib.postgres",
     "rest_framework",
     "rest_framework_simplejwt",
     "channels",
@@ -38,6 +40,7 @@ MIDDLEWARE = [
     "django.middleware.common.CommonMiddleware",
     "django.middleware.csrf.CsrfViewMiddleware",
     "django.contrib.auth.middleware.AuthenticationMiddleware",
+    "config.db_router.ReplicaPinMiddleware",
     "django.contrib.messages.middleware.MessageMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
     "django.middleware.cache.FetchFromCacheMiddleware",
@@ -74,6 +77,37 @@ DATABASES = {
     }
 }
 
+#* psycopg 3 connection pool by default; without it connections are per request
+#* unless DB_CONN_MAX_AGE is set, which only suits WSGI: under ASGI every
+#* executor thread keeps its own connection open (Django ticket #33497)
+if os.getenv("DB_POOL", "true").lower() in ("1", "true", "yes"):
+    DATABASES["default"]["OPTIONS"] = {
+        "pool": {
+            "min_size": int(os.getenv("DB_POOL_MIN_SIZE", 2)),
+            "max_size": int(os.getenv("DB_POOL_MAX_SIZE", 20)),
+            "timeout": float(os.getenv("DB_POOL_TIMEOUT", 10)),
+            "max_idle": float(os.getenv("DB_POOL_MAX_IDLE", 300)),
+        }
+    }
+else:
+    DATABASES["default"]["CONN_MAX_AGE"] = int(os.getenv("DB_CONN_MAX_AGE", 0))
+    DATABASES["default"]["CONN_HEALTH_CHECKS"] = True
+
+#* read replicas as comma-separated host[:port] list, e.g. "10.0.0.2,10.0.0.3:5433"
+DATABASE_REPLICAS = []
+for i, replica in enumerate(filter(None, os.getenv("DB_REPLICA_HOSTS", "").split(","))):
+    host, _, port = replica.strip().partition(":")
+    DATABASES[f"replica_{i}"] = {
+        **copy.deepcopy(DATABASES["default"]),
+        "HOST": host,
+        "PORT": port or "5432",
+        "TEST": {"MIRROR": "default"},
+    }
+    DATABASE_REPLICAS.append(f"replica_{i}")
+
+DATABASE_ROUTERS = ["config.db_router.ReplicaRouter"]
+REPLICA_PIN_SECONDS = int(os.getenv("REPLICA_PIN_SECONDS", 5))
+
 AUTH_PASSWORD_VALIDATORS = [
     {
         "NAME": "django.contrib.auth.password_validation.UserAttributeSimilarityValidator",
@@ -89,6 +123,27 @@ AUTH_PASSWORD_VALIDATORS = [
     },
 ]
 
+#* preferred hasher (argon2, scrypt or pbkdf2); the others stay listed so
+#* existing hashes still verify and are rehashed on login
+PASSWORD_HASHER = os.getenv("PASSWORD_HASHER", "argon2")
+_PASSWORD_HASHERS = {
+    "argon2": "users.hashers.TunedArgon2PasswordHasher",
+    "scrypt": "users.hashers.TunedScryptPasswordHasher",
+    "pbkdf2": "django.contrib.auth.hashers.PBKDF2PasswordHasher",
+}
+PASSWORD_HASHERS = [_PASSWORD_HASHERS[PASSWORD_HASHER]] + [
+    hasher for name, hasher in _PASSWORD_HASHERS.items() if name != PASSWORD_HASHER
+]
+PASSWORD_ARGON2_TIME_COST = int(os.getenv("PASSWORD_ARGON2_TIME_COST", 2))
+PASSWORD_ARGON2_MEMORY_COST = int(os.getenv("PASSWORD_ARGON2_MEMORY_COST", 19456))
+PASSWORD_ARGON2_PARALLELISM = int(os.getenv("PASSWORD_ARGON2_PARALLELISM", 1))
+PASSWORD_SCRYPT_WORK_FACTOR = int(os.getenv("PASSWORD_SCRYPT_WORK_FACTOR", 2**14))
+PASSWORD_SCRYPT_BLOCK_SIZE = int(os.getenv("PASSWORD_SCRYPT_BLOCK_SIZE", 8))
+PASSWORD_SCRYPT_PARALLELISM = int(os.getenv("PASSWORD_SCRYPT_PARALLELISM", 1))
+PASSWORD_SCRYPT_MAXMEM = int(os.getenv("PASSWORD_SCRYPT_MAXMEM", 64 * 1024 * 1024))
+#* worker processes that hash passwords off the request threads, 0 hashes inline
+PASSWORD_HASHING_WORKERS = int(os.getenv("PASSWORD_HASHING_WORKERS", 0))
+
 LANGUAGE_CODE = "en-us"
 TIME_ZONE = "Asia/Ashgabat"
 USE_I18N = True
@@ -103,7 +158,7 @@ AUTH_USER_MODEL = "users.User"
 
 REST_FRAMEWORK = {
     "DEFAULT_AUTHENTICATION_CLASSES": (
-        "rest_framework_simplejwt.authentication.JWTAuthentication",
+        "users.authentication.CachedJWTAuthentication",
         "rest_framework.authentication.SessionAuthentication",
     ),
     "DEFAULT_FILTER_BACKENDS": ("django_filters.rest_framework.DjangoFilterBackend",),
@@ -111,7 +166,14 @@ REST_FRAMEWORK = {
         "rest_framework.permissions.IsAuthenticated",
     ],
     "DEFAULT_SCHEMA_CLASS": "drf_spectacular.openapi.AutoSchema",
+    "DEFAULT_RENDERER_CLASSES": (
+        "config.renderers.FastJSONRenderer",
+        "rest_framework.renderers.BrowsableAPIRenderer",
+    ),
+    "DEFAULT_PAGINATION_CLASS": "config.pagination.CreatedAtCursorPagination",
+    "PAGE_SIZE": int(os.getenv("API_PAGE_SIZE", 50)),
 }
+API_MAX_PAGE_SIZE = int(os.getenv("API_MAX_PAGE_SIZE", 500))
 
 SPECTACULAR_SETTINGS = {
     "SWAGGER_UI_DIST": "SIDECAR",
@@ -125,6 +187,8 @@ SIMPLE_JWT = {
     "REFRESH_TOKEN_LIFETIME": timedelta(days=1),
     "AUTH_HEADER_TYPES": ("Bearer",),
 }
+#* how long a resolved JWT user is reused before hitting the database again
+AUTH_USER_CACHE_TIMEOUT = 60
 
 CHANNEL_LAYERS = {
     "default": {
@@ -148,6 +212,43 @@ CACHES = {
 CACHE_MIDDLEWARE_ALIAS = "default"
 CACHE_MIDDLEWARE_SECONDS = 60 * 15
 CACHE_MIDDLEWARE_KEY_PREFIX = "ecommerce"
+PRODUCT_CACHE_TIMEOUT = 60 * 15
+PRODUCT_CACHE_STALE_TIMEOUT = 60
+PRODUCT_CACHE_LOCK_TIMEOUT = 10
+PRODUCT_CACHE_LOCK_WAIT = 2
+PRODUCT_CACHE_REFRESH_BETA = 1.0
+PRODUCT_LOCAL_CACHE_MAX_ENTRIES = int(os.getenv("PRODUCT_LOCAL_CACHE_MAX_ENTRIES", 1000))
+PRODUCT_LOCAL_CACHE_MAX_BYTES = 32 * 1024 * 1024
+PRODUCT_LOCAL_CACHE_TIMEOUT = 5
+PRODUCT_FRAGMENT_TIMEOUT = 60 * 60 * 24
+
+#* max number of orders accepted by one /orders/bulk/ request
+ORDERS_BULK_MAX_SIZE = int(os.getenv("ORDERS_BULK_MAX_SIZE", 500))
+#* number of sharded admin order feeds (orders.admin.<n>), 1 disables sharding
+ORDERS_ADMIN_SHARDS = int(os.getenv("ORDERS_ADMIN_SHARDS", 1))
+#* upper bounds for batched websocket order frames (subscribe with batch_ms)
+ORDERS_WS_MAX_BATCH_MS = int(os.getenv("ORDERS_WS_MAX_BATCH_MS", 1000))
+ORDERS_WS_MAX_BATCH_SIZE = int(os.getenv("ORDERS_WS_MAX_BATCH_SIZE", 100))
+#* websocket flow control for clients that subscribe with acks: at most
+#* ORDERS_WS_MAX_UNACKED order frames in flight, up to ORDERS_WS_SEND_QUEUE_SIZE
+#* more wait per socket, and when those are full the slow consumer policy applies:
+#* drop_oldest, coalesce (replace the backlog with a resume notice) or disconnect.
+#* Sockets that never ack are written as fast as the server accepts the frames
+ORDERS_WS_MAX_UNACKED = int(os.getenv("ORDERS_WS_MAX_UNACKED", 100))
+ORDERS_WS_SEND_QUEUE_SIZE = int(os.getenv("ORDERS_WS_SEND_QUEUE_SIZE", 100))
+ORDERS_WS_SLOW_CONSUMER_POLICY = os.getenv(
+    "ORDERS_WS_SLOW_CONSUMER_POLICY", "drop_oldest"
+)
+#* Redis stream of recent order events used to resume websocket clients
+ORDERS_EVENTS_REDIS_URL = os.getenv(
+    "ORDERS_EVENTS_REDIS_URL", "redis://127.0.0.1:6379/0"
+)
+ORDERS_EVENTS_STREAM_MAXLEN = int(os.getenv("ORDERS_EVENTS_STREAM_MAXLEN", 10000))
+ORDERS_EVENTS_RESUME_LIMIT = int(os.getenv("ORDERS_EVENTS_RESUME_LIMIT", 1000))
+#* relayed outbox rows (orders.OrderEvent) are deleted after this many hours
+ORDERS_OUTBOX_RETENTION_HOURS = int(os.getenv("ORDERS_OUTBOX_RETENTION_HOURS", 24))
+#* how long an Idempotency-Key keeps answering retries (seconds)
+ORDERS_IDEMPOTENCY_TTL = int(os.getenv("ORDERS_IDEMPOTENCY_TTL", 60 * 60 * 24))
 
 
 #* Redis working test
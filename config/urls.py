@@ -2,9 +2,13 @@ from django.urls import path, include
 from django.conf import settings
 from django.conf.urls.static import static
 from drf_spectacular.views import SpectacularAPIView, SpectacularSwaggerView
+from .views import DatabasePoolStatsView
 
 urlpatterns = [
     path("api/", include("users.urls")),
+    path("api/", include("orders.urls")),
+    path("api/", include("products.urls")),
+    path("api/db/pool/", DatabasePoolStatsView.as_view(), name="db-pool-stats"),
     path("api/schema/", SpectacularAPIView.as_view(), name="schema"),
     path(
         "api/swagger/",
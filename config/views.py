@@ -0,0 +1,16 @@
+from django.utils.decorators import method_decorator
+from django.views.decorators.cache import never_cache
+from rest_framework.permissions import IsAdminUser
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from .db_pool import pool_stats
+
+
+#* connection pool metrics of the worker process serving the request
+@method_decorator(never_cache, name="dispatch")
+class DatabasePoolStatsView(APIView):
+    permission_classes = [IsAdminUser]
+
+    def get(self, request):
+        return Response(pool_stats())
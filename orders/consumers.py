@@ -1,14 +1,34 @@
+import asyncio
 import json
 import logging
+from collections import deque
+from django.conf import settings
 from channels.generic.websocket import AsyncWebsocketConsumer
 from channels.db import database_sync_to_async
 from rest_framework_simplejwt.tokens import AccessToken
 from django.contrib.auth.models import AnonymousUser
 from .utils import OrderHandlerMixin
+from .groups import ADMIN_GROUP, admin_group, shard_for, user_group
+from .events import event_frame, read_events
+
+#* an order can reach a socket through several groups (own + admin feeds) and
+#* more than once under a new event_id when the relay retries; frames are
+#* deduplicated by order id, which is what clients should use too
+RECENT_ORDERS_SIZE = 256
+SLOW_CONSUMER_CLOSE_CODE = 4008
 
 logger = logging.getLogger(__name__)
 
 
+#* stream ids ("<ms>-<seq>") as comparable tuples
+def _stream_id(event_id):
+    try:
+        ms, _, seq = event_id.partition("-")
+        return int(ms), int(seq or 0)
+    except ValueError:
+        raise ValueError("Invalid event_id")
+
+
 class OrderConsumer(AsyncWebsocketConsumer, OrderHandlerMixin):
     async def connect(self):
         logger.info(f"WebSocket connect attempt: {self.channel_name}")
@@ -32,7 +52,20 @@ class OrderConsumer(AsyncWebsocketConsumer, OrderHandlerMixin):
         self.scope["user"] = user
         logger.info(f"User authenticated: {user}")
 
-        await self.channel_layer.group_add("orders", self.channel_name)
+        self.subscribed_groups = set()
+        self.recent_orders = deque(maxlen=RECENT_ORDERS_SIZE)
+        self.batch_ms = 0
+        self.pending_orders = []
+        self.flush_task = None
+        #* bounded outgoing queue drained by one writer task; for sockets that ack,
+        #* the writer keeps at most ORDERS_WS_MAX_UNACKED order frames in flight
+        self.send_queue = deque()
+        self.send_ready = asyncio.Event()
+        self.last_event_id = None
+        self.acks = False
+        self.unacked = deque()
+        self.writer_task = asyncio.create_task(self.write_frames())
+        await self.join_groups({user_group(user.pk)})
         await self.accept()
         logger.info(f"WebSocket connection accepted: {self.channel_name}")
         print(f"Consumer: WebSocket connection accepted: {self.channel_name}")
@@ -44,7 +77,37 @@ class OrderConsumer(AsyncWebsocketConsumer, OrderHandlerMixin):
         print(
             f"Consumer: WebSocket disconnected with code: {close_code}, channel: {self.channel_name}"
         )
-        await self.channel_layer.group_discard("orders", self.channel_name)
+        for task in (
+            getattr(self, "flush_task", None),
+            getattr(self, "writer_task", None),
+        ):
+            if task:
+                task.cancel()
+        await self.leave_groups(set(getattr(self, "subscribed_groups", ())))
+
+    async def join_groups(self, groups):
+        for group in groups - self.subscribed_groups:
+            await self.channel_layer.group_add(group, self.channel_name)
+        self.subscribed_groups |= groups
+
+    async def leave_groups(self, groups):
+        for group in groups & self.subscribed_groups:
+            await self.channel_layer.group_discard(group, self.channel_name)
+        self.subscribed_groups -= groups
+
+    #* staff only: the whole admin feed, or some of its shards
+    def get_admin_groups(self, data):
+        if not self.scope["user"].is_staff:
+            raise PermissionError("Permission denied")
+        shards = data.get("shards")
+        if shards is None:
+            return {admin_group()}
+        if not isinstance(shards, list) or not all(
+            isinstance(shard, int) and 0 <= shard < settings.ORDERS_ADMIN_SHARDS
+            for shard in shards
+        ):
+            raise ValueError("Invalid shards")
+        return {admin_group(shard) for shard in shards}
 
     async def receive(self, text_data):
         logger.info(f"Received WebSocket message: {text_data}")
@@ -54,15 +117,39 @@ class OrderConsumer(AsyncWebsocketConsumer, OrderHandlerMixin):
             message_type = data.get("type")
 
             if message_type == "create_order":
-                order, error = await database_sync_to_async(self.create_order)(
-                    self.scope["user"], data
-                )
+                order_id, error = await self.acreate_order(self.scope["user"], data)
                 if error:
                     await self.send(text_data=json.dumps({"error": error}))
                 else:
                     await self.send(
-                        text_data=json.dumps({"message": f"Order {order.id} created"})
+                        text_data=json.dumps({"message": f"Order {order_id} created"})
                     )
+            elif message_type in ("subscribe", "unsubscribe"):
+                if "feed" in data:
+                    if data["feed"] != "admin":
+                        raise ValueError("Invalid feed")
+                    groups = self.get_admin_groups(data)
+                    if message_type == "subscribe":
+                        await self.join_groups(groups)
+                    else:
+                        await self.leave_groups(groups)
+                if message_type == "subscribe" and "batch_ms" in data:
+                    await self.set_batching(data["batch_ms"])
+                if message_type == "subscribe" and "acks" in data:
+                    self.set_acks(data["acks"])
+                await self.send(
+                    text_data=json.dumps(
+                        {
+                            "subscribed": sorted(self.subscribed_groups),
+                            "batch_ms": self.batch_ms,
+                            "acks": self.acks,
+                        }
+                    )
+                )
+            elif message_type == "ack":
+                self.ack(data.get("event_id"))
+            elif message_type == "resume":
+                await self.resume(data.get("last_id"))
             else:
                 await self.send(text_data=json.dumps({"error": "Invalid message type"}))
         except json.JSONDecodeError as e:
@@ -72,23 +159,149 @@ class OrderConsumer(AsyncWebsocketConsumer, OrderHandlerMixin):
             logger.error(f"Error processing message: {e}")
             await self.send(text_data=json.dumps({"error": str(e)}))
 
+    #* opt-in batching: orders are buffered for up to batch_ms, 0 sends each one
+    async def set_batching(self, batch_ms):
+        if (
+            not isinstance(batch_ms, int)
+            or isinstance(batch_ms, bool)
+            or not 0 <= batch_ms <= settings.ORDERS_WS_MAX_BATCH_MS
+        ):
+            raise ValueError("Invalid batch_ms")
+        self.batch_ms = batch_ms
+        if not batch_ms:
+            await self.flush_orders()
+
+    #* the frame is encoded once by the producer and sent as is
     async def send_order(self, event):
-        logger.info(f"Received event: {event}")
-        print(f"Consumer: Received event: {event}")
+        logger.info(f"Received order event: {event['id']}")
         try:
-            order_data = event["order"]
-            logger.info(f"Sending order data: {order_data}")
-            print(f"Consumer: Sending order data: {order_data}")
-            await self.send(text_data=json.dumps({"order": order_data}))
-            logger.info("Order sent successfully")
-            print("Consumer: Order sent successfully")
+            if event["id"] in self.recent_orders:
+                return
+            self.recent_orders.append(event["id"])
+            if not self.batch_ms:
+                await self.enqueue_frame(event["frame"], event["event_id"])
+                return
+            self.pending_orders.append((event["frame"], event["event_id"]))
+            if len(self.pending_orders) >= settings.ORDERS_WS_MAX_BATCH_SIZE:
+                await self.flush_orders()
+            elif self.flush_task is None:
+                self.flush_task = asyncio.create_task(self.flush_orders_later())
         except Exception as e:
             logger.error(f"Error sending order: {e}")
             print(f"Consumer: Error sending order: {e}")
 
+    #* opt-in flow control: the client acks the event_id of the frames it processed
+    def set_acks(self, acks):
+        if not isinstance(acks, bool):
+            raise ValueError("Invalid acks")
+        self.acks = acks
+        if not acks:
+            self.unacked.clear()
+            self.send_ready.set()
+
+    #* acks are cumulative: everything up to event_id has been processed
+    def ack(self, event_id):
+        if not isinstance(event_id, str) or not event_id:
+            raise ValueError("Invalid event_id")
+        acked = _stream_id(event_id)
+        while self.unacked and _stream_id(self.unacked[0]) <= acked:
+            self.unacked.popleft()
+        self.send_ready.set()
+
+    def window_full(self):
+        return self.acks and len(self.unacked) >= settings.ORDERS_WS_MAX_UNACKED
+
+    async def flush_orders_later(self):
+        await asyncio.sleep(self.batch_ms / 1000)
+        self.flush_task = None
+        await self.flush_orders()
+
+    #* buffered frames go out as one JSON array frame
+    async def flush_orders(self):
+        if self.flush_task is not None:
+            self.flush_task.cancel()
+            self.flush_task = None
+        if not self.pending_orders:
+            return
+        pending, self.pending_orders = self.pending_orders, []
+        await self.enqueue_frame(
+            "[" + ",".join(frame for frame, _ in pending) + "]", pending[-1][1]
+        )
+        logger.info(f"Flushed {len(pending)} orders")
+
+    #* frames only queue up while the ack window is full, so a full queue means the
+    #* client processes orders slower than they arrive
+    async def enqueue_frame(self, frame, event_id):
+        if len(self.send_queue) >= settings.ORDERS_WS_SEND_QUEUE_SIZE:
+            policy = settings.ORDERS_WS_SLOW_CONSUMER_POLICY
+            logger.warning(f"Send queue full for {self.channel_name}, policy {policy}")
+            if policy == "disconnect":
+                await self.close_slow_consumer()
+                return
+            if policy == "coalesce":
+                #* the backlog is replaced by one notice, the client resumes from the stream
+                self.send_queue.clear()
+                self.send_queue.append(
+                    (json.dumps({"missed": True, "resume": self.last_event_id}), None)
+                )
+            else:
+                self.send_queue.popleft()
+        self.send_queue.append((frame, event_id))
+        self.send_ready.set()
+
+    async def write_frames(self):
+        while True:
+            await self.send_ready.wait()
+            self.send_ready.clear()
+            while self.send_queue and not self.window_full():
+                frame, event_id = self.send_queue.popleft()
+                if event_id is not None:
+                    self.last_event_id = event_id
+                    if self.acks:
+                        self.unacked.append(event_id)
+                await self.send(text_data=frame)
+
+    #* the resume token is the id of the last event handed to the client
+    async def close_slow_consumer(self):
+        self.send_queue.clear()
+        self.writer_task.cancel()
+        await self.send(
+            text_data=json.dumps({"error": "Too slow", "resume": self.last_event_id})
+        )
+        await self.close(code=SLOW_CONSUMER_CLOSE_CODE)
+
+    def can_see_event(self, fields):
+        if ADMIN_GROUP in self.subscribed_groups or fields["user_id"] == str(
+            self.scope["user"].pk
+        ):
+            return True
+        return admin_group(shard_for(int(fields["order_id"]))) in self.subscribed_groups
+
+    #* replay the events after last_id this socket is subscribed to as one array
+    #* frame, sent ahead of the queue like any other reply
+    async def resume(self, last_id):
+        if not isinstance(last_id, str) or not last_id:
+            raise ValueError("Invalid last_id")
+        events = await read_events(last_id, settings.ORDERS_EVENTS_RESUME_LIMIT)
+        frames = []
+        for event_id, fields in events:
+            if self.can_see_event(fields):
+                self.recent_orders.append(int(fields["order_id"]))
+                frames.append(event_frame(event_id, fields["order"]))
+        if frames:
+            await self.send(text_data="[" + ",".join(frames) + "]")
+        await self.send(
+            text_data=json.dumps(
+                {
+                    "resumed": len(frames),
+                    "last_id": events[-1][0] if events else last_id,
+                }
+            )
+        )
+
     @database_sync_to_async
     def get_user_from_token(self, token_key):
-        from django.contrib.auth import get_user_model
+        from users.authentication import get_user_for_token
 
         try:
             if not token_key:
@@ -97,9 +310,7 @@ class OrderConsumer(AsyncWebsocketConsumer, OrderHandlerMixin):
 
             # Валидация JWT
             token = AccessToken(token_key)
-            user_id = token["user_id"]
-            User = get_user_model()
-            user = User.objects.get(id=user_id)
+            user = get_user_for_token(token)
             logger.info(f"JWT token validated for user: {user}")
             return user
         except Exception as e:
@@ -0,0 +1,60 @@
+import asyncio
+import weakref
+
+import redis.asyncio as redis
+from django.conf import settings
+
+from config.renderers import dumps
+
+#* recent order events, kept so reconnecting sockets can catch up by id
+STREAM_KEY = "orders:events"
+
+#* redis.asyncio connections belong to the loop that opened them
+_clients = weakref.WeakKeyDictionary()
+
+
+def get_client():
+    loop = asyncio.get_running_loop()
+    client = _clients.get(loop)
+    if client is None:
+        client = _clients[loop] = redis.from_url(settings.ORDERS_EVENTS_REDIS_URL)
+    return client
+
+
+#* websocket frame of one event, built from the stored order JSON without re-encoding
+def event_frame(event_id, order_json):
+    return '{"event_id":"%s","order":%s}' % (event_id, order_json)
+
+
+#* append orders to the stream in one round trip, returns (event id, frame) pairs
+async def publish_events(events):
+    order_jsons = [dumps(order_data).decode() for _, order_data in events]
+    async with get_client().pipeline(transaction=False) as pipe:
+        for (user_id, order_data), order_json in zip(events, order_jsons):
+            pipe.xadd(
+                STREAM_KEY,
+                {
+                    "user_id": str(user_id),
+                    "order_id": order_data["id"],
+                    "order": order_json,
+                },
+                maxlen=settings.ORDERS_EVENTS_STREAM_MAXLEN,
+                approximate=True,
+            )
+        event_ids = await pipe.execute()
+    return [
+        (event_id.decode(), event_frame(event_id.decode(), order_json))
+        for event_id, order_json in zip(event_ids, order_jsons)
+    ]
+
+
+#* events after last_id (exclusive), oldest first, as (event id, fields)
+async def read_events(last_id, count):
+    entries = await get_client().xrange(STREAM_KEY, min=f"({last_id}", count=count)
+    return [
+        (
+            event_id.decode(),
+            {key.decode(): value.decode() for key, value in fields.items()},
+        )
+        for event_id, fields in entries
+    ]
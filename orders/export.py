@@ -0,0 +1,100 @@
+import csv
+import json
+from itertools import islice
+
+from asgiref.sync import sync_to_async
+from django.core.handlers.asgi import ASGIRequest
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import StreamingHttpResponse
+
+EXPORT_FORMATS = ("ndjson", "csv")
+EXPORT_CHUNK_SIZE = 2000
+#* lines joined per thread hop when streaming under ASGI
+ASYNC_STREAM_LINES = 500
+
+ORDER_CSV_FIELDS = [
+    "order_id",
+    "user",
+    "created_at",
+    "is_paid",
+    "product_id",
+    "product_name",
+    "quantity",
+    "unit_price",
+]
+
+
+class _Echo:
+    #* csv.writer target that hands each formatted line back instead of buffering it
+    def write(self, value):
+        return value
+
+
+#* Django's ASGI handler buffers sync streaming content into a list before the
+#* first byte, so under ASGI the lines are pulled in chunks through
+#* sync_to_async; thread_sensitive keeps them on the request's thread, where the
+#* server-side cursor lives
+async def _async_lines(lines):
+    next_chunk = sync_to_async(lambda: list(islice(lines, ASYNC_STREAM_LINES)))
+    try:
+        while chunk := await next_chunk():
+            yield "".join(chunk)
+    finally:
+        await sync_to_async(lines.close)()
+
+
+def stream_export(request, rows, fields, output, filename):
+    if output == "csv":
+        writer = csv.writer(_Echo())
+
+        def lines():
+            yield writer.writerow(fields)
+            for row in rows:
+                yield writer.writerow([row.get(field) for field in fields])
+
+        content = lines()
+        content_type = "text/csv"
+    else:
+        content = (json.dumps(row, cls=DjangoJSONEncoder) + "\n" for row in rows)
+        content_type = "application/x-ndjson"
+
+    if isinstance(getattr(request, "_request", request), ASGIRequest):
+        content = _async_lines(content)
+    response = StreamingHttpResponse(content, content_type=content_type)
+    response["Content-Disposition"] = f'attachment; filename="{filename}.{output}"'
+    return response
+
+
+#* one dict per order (ndjson) read through a server-side cursor
+def order_rows(queryset, chunk_size=EXPORT_CHUNK_SIZE):
+    for order in queryset.iterator(chunk_size=chunk_size):
+        yield {
+            "id": order.id,
+            "user": order.user.phone,
+            "created_at": order.created_at,
+            "is_paid": order.is_paid,
+            "items": [
+                {
+                    "product_id": item.product_id,
+                    "product_name": item.product.name,
+                    "quantity": item.quantity,
+                    "unit_price": item.unit_price,
+                }
+                for item in order.items.all()
+            ],
+        }
+
+
+#* flattens orders to one row per item for csv
+def order_item_rows(orders):
+    for order in orders:
+        base = {
+            "order_id": order["id"],
+            "user": order["user"],
+            "created_at": order["created_at"].isoformat(),
+            "is_paid": order["is_paid"],
+        }
+        if not order["items"]:
+            yield base
+        for item in order["items"]:
+            yield {**base, **item}
@@ -0,0 +1,27 @@
+from django.conf import settings
+
+#* channel layer groups for order events: every user listens to their own
+#* orders, staff subscribe to the whole admin feed or to a few of its shards
+ADMIN_GROUP = "orders.admin"
+
+
+def user_group(user_id):
+    return f"orders.user.{user_id}"
+
+
+def admin_group(shard=None):
+    if shard is None:
+        return ADMIN_GROUP
+    return f"{ADMIN_GROUP}.{shard}"
+
+
+def shard_for(order_id):
+    return order_id % settings.ORDERS_ADMIN_SHARDS
+
+
+#* groups an order event is sent to, one group_send each
+def groups_for_order(user_id, order_id):
+    groups = [user_group(user_id), ADMIN_GROUP]
+    if settings.ORDERS_ADMIN_SHARDS > 1:
+        groups.append(admin_group(shard_for(order_id)))
+    return groups
@@ -0,0 +1,83 @@
+import hashlib
+import json
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import IntegrityError, transaction
+
+from .models import IdempotencyKey
+
+import logging
+
+logger = logging.getLogger(__name__)
+
+MAX_KEY_LENGTH = 255
+
+
+class IdempotencyError(Exception):
+    pass
+
+
+def _cache_key(user_id, key):
+    return f"orders:idempotency:{user_id}:{key}"
+
+
+#* hash of the request body, a key reused with another body is rejected
+def request_hash(data):
+    body = json.dumps(data, sort_keys=True, cls=DjangoJSONEncoder)
+    return hashlib.sha256(body.encode()).hexdigest()
+
+
+def validate_key(key):
+    if not isinstance(key, str) or not key or len(key) > MAX_KEY_LENGTH:
+        raise IdempotencyError(f"Idempotency-Key must be 1-{MAX_KEY_LENGTH} characters")
+
+
+def _stored(entry, fingerprint):
+    status_code, response, stored_hash = entry
+    if stored_hash != fingerprint:
+        raise IdempotencyError("Idempotency-Key was already used for another request")
+    return status_code, response
+
+
+#* runs write() -> (status code, response) at most once per (user, key);
+#* returns (status code, response, replayed). Retries are answered from Redis;
+#* the unique row written in the same transaction settles concurrent and
+#* post-eviction duplicates, whose write is rolled back
+def run_once(user, key, fingerprint, write):
+    validate_key(key)
+    cache_key = _cache_key(user.pk, key)
+    entry = cache.get(cache_key)
+    if entry is not None:
+        return (*_stored(entry, fingerprint), True)
+
+    try:
+        with transaction.atomic():
+            status_code, response = write()
+            IdempotencyKey.objects.create(
+                user=user,
+                key=key,
+                request_hash=fingerprint,
+                status_code=status_code,
+                response=response,
+            )
+        replayed = False
+    except IntegrityError:
+        row = IdempotencyKey.objects.filter(user=user, key=key).first()
+        if row is None:
+            raise
+        logger.info(f"Duplicate order request for idempotency key {key}")
+        entry = (row.status_code, row.response, row.request_hash)
+        status_code, response = _stored(entry, fingerprint)
+        replayed = True
+    else:
+        #* the cached copy goes through JSON like the stored row does
+        response = json.loads(json.dumps(response, cls=DjangoJSONEncoder))
+
+    cache.set(
+        cache_key,
+        (status_code, response, fingerprint),
+        settings.ORDERS_IDEMPOTENCY_TTL,
+    )
+    return status_code, response, replayed
@@ -0,0 +1,106 @@
+import gzip
+import json
+import os
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from django.utils import timezone
+
+from orders.export import order_rows
+from orders.models import Order, OrderItem
+from products import rollup
+
+
+def _add_months(day, months):
+    month = day.month - 1 + months
+    return date(day.year + month // 12, month % 12 + 1, 1)
+
+
+class Command(BaseCommand):
+    help = (
+        "Move orders older than N months into one gzipped NDJSON file per month "
+        "and delete them; the daily sales rollup is kept"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--months", type=int, required=True)
+        parser.add_argument("--output-dir", required=True)
+        parser.add_argument("--batch-size", type=int, default=1000)
+        parser.add_argument("--dry-run", action="store_true")
+
+    def handle(self, *args, **options):
+        if options["months"] < 1:
+            raise CommandError("--months must be at least 1")
+        os.makedirs(options["output_dir"], exist_ok=True)
+
+        cutoff = _add_months(timezone.localdate().replace(day=1), -options["months"])
+        oldest = Order.objects.order_by("created_at").first()
+        if oldest is None:
+            self.stdout.write("No orders to archive")
+            return
+
+        month = timezone.localdate(oldest.created_at).replace(day=1)
+        while month < cutoff:
+            self.archive_month(month, _add_months(month, 1), options)
+            month = _add_months(month, 1)
+
+    def archive_month(self, start, end, options):
+        orders = Order.objects.filter(
+            created_at__date__gte=start, created_at__date__lt=end
+        )
+        count = orders.count()
+        if not count:
+            return
+        label = start.strftime("%Y-%m")
+        if options["dry_run"]:
+            self.stdout.write(f"{label}: would archive {count} orders")
+            return
+
+        path = os.path.join(options["output_dir"], f"orders-{label}.ndjson.gz")
+        if os.path.exists(path):
+            self.resume_month(label, path, orders, options)
+            return
+
+        queryset = (
+            orders.select_related("user")
+            .prefetch_related("items__product")
+            .order_by("id")
+        )
+        ids = []
+        with gzip.open(f"{path}.partial", "wt", encoding="utf-8") as archive:
+            for row in order_rows(queryset):
+                archive.write(json.dumps(row, cls=DjangoJSONEncoder) + "\n")
+                ids.append(row["id"])
+        os.rename(f"{path}.partial", path)
+
+        #* only the orders that made it into the file are deleted
+        self.delete_orders(ids, options["batch_size"])
+        self.stdout.write(
+            self.style.SUCCESS(f"{label}: archived {len(ids)} orders to {path}")
+        )
+
+    #* a finished archive from an interrupted run: delete what it already holds
+    def resume_month(self, label, path, orders, options):
+        with gzip.open(path, "rt", encoding="utf-8") as archive:
+            ids = [json.loads(line)["id"] for line in archive]
+        self.delete_orders(ids, options["batch_size"])
+
+        remaining = orders.count()
+        if remaining:
+            raise CommandError(
+                f"{path} already exists and {remaining} orders of {label} are not "
+                "in it, refusing to overwrite"
+            )
+        self.stdout.write(
+            self.style.SUCCESS(f"{label}: resumed, {path} holds {len(ids)} orders")
+        )
+
+    def delete_orders(self, ids, batch_size):
+        with rollup.preserve():
+            for i in range(0, len(ids), batch_size):
+                batch = ids[i : i + batch_size]
+                with transaction.atomic():
+                    OrderItem.objects.filter(order_id__in=batch).delete()
+                    Order.objects.filter(id__in=batch).delete()
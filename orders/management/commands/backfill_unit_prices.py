@@ -0,0 +1,34 @@
+from django.core.management.base import BaseCommand
+from django.db.models import OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+from orders.models import OrderItem
+from products.models import Product
+
+
+class Command(BaseCommand):
+    help = "Fill OrderItem.unit_price for rows created before prices were stored"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=5000)
+
+    def handle(self, *args, **options):
+        batch_size = options["batch_size"]
+        current_price = Product.objects.filter(pk=OuterRef("product_id")).values(
+            sale_price=Coalesce("special_price", "price")
+        )[:1]
+
+        updated = 0
+        while True:
+            ids = list(
+                OrderItem.objects.filter(unit_price__isnull=True).values_list(
+                    "id", flat=True
+                )[:batch_size]
+            )
+            if not ids:
+                break
+            updated += OrderItem.objects.filter(id__in=ids).update(
+                unit_price=Subquery(current_price)
+            )
+
+        self.stdout.write(self.style.SUCCESS(f"Filled unit_price for {updated} items"))
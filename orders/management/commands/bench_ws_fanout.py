@@ -0,0 +1,63 @@
+import asyncio
+import random
+import time
+
+from channels.layers import get_channel_layer
+from django.core.management.base import BaseCommand
+
+from orders.groups import ADMIN_GROUP, groups_for_order, user_group
+
+LEGACY_GROUP = "orders"
+
+
+class Command(BaseCommand):
+    help = (
+        "Measure order broadcast cost for simulated websocket connections: one "
+        "global group against per-user and admin groups"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--connections", type=int, default=10000)
+        parser.add_argument("--admins", type=int, default=10)
+        parser.add_argument("--orders", type=int, default=100)
+
+    def handle(self, *args, **options):
+        for mode in ("global", "grouped"):
+            elapsed, deliveries = asyncio.run(self.run(mode, options))
+            self.stdout.write(
+                f"{mode:>7}: {options['orders']} orders to "
+                f"{options['connections']} connections in {elapsed:.2f}s, "
+                f"{options['orders'] / elapsed:.1f} orders/sec, "
+                f"{deliveries} deliveries"
+            )
+
+    #* subscribers are bare channels, only the group_send side is timed
+    async def run(self, mode, options):
+        layer = get_channel_layer()
+        await layer.flush()
+        connections = options["connections"]
+        for user_id in range(connections):
+            channel = await layer.new_channel()
+            if mode == "global":
+                await layer.group_add(LEGACY_GROUP, channel)
+            else:
+                await layer.group_add(user_group(user_id), channel)
+                if user_id < options["admins"]:
+                    await layer.group_add(ADMIN_GROUP, channel)
+
+        message = {"type": "send_order", "id": 0, "frame": '{"order":{}}'}
+        deliveries = 0
+        started = time.perf_counter()
+        for order_id in range(options["orders"]):
+            message["id"] = order_id
+            if mode == "global":
+                await layer.group_send(LEGACY_GROUP, message)
+                deliveries += connections
+            else:
+                user_id = random.randrange(connections)
+                for group in groups_for_order(user_id, order_id):
+                    await layer.group_send(group, message)
+                deliveries += 1 + options["admins"]
+        elapsed = time.perf_counter() - started
+        await layer.flush()
+        return elapsed, deliveries
@@ -0,0 +1,65 @@
+import asyncio
+import time
+
+from django.core.management.base import BaseCommand
+
+from orders.outbox import relay_pending
+from orders.utils import OrderHandlerMixin
+from products.models import Product
+from users.models import User
+
+BENCH_PHONE = "bench-ws"
+BENCH_PRODUCT = "bench-ws-product"
+
+
+class Command(BaseCommand):
+    help = (
+        "Measure websocket order throughput (orders/sec) in its two stages: "
+        "acreate_order writing the order and its outbox row, then the relay "
+        "publishing the events (stop relay_order_events while this runs)"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--orders", type=int, default=1000)
+        parser.add_argument("--concurrency", type=int, default=50)
+        parser.add_argument("--batch-size", type=int, default=500)
+
+    def handle(self, *args, **options):
+        user, _ = User.objects.get_or_create(
+            phone=BENCH_PHONE, defaults={"full_name": "Websocket benchmark"}
+        )
+        try:
+            elapsed = asyncio.run(self.create(user, options))
+            self.report("create", options["orders"], elapsed)
+
+            loop = asyncio.new_event_loop()
+            relayed = 0
+            started = time.perf_counter()
+            try:
+                while batch := relay_pending(options["batch_size"], loop):
+                    relayed += batch
+            finally:
+                loop.close()
+            self.report("relay", relayed, time.perf_counter() - started)
+        finally:
+            user.delete()
+            Product.objects.filter(name=BENCH_PRODUCT).delete()
+
+    def report(self, label, count, elapsed):
+        self.stdout.write(
+            f"{label:>6}: {count} orders in {elapsed:.2f}s, "
+            f"{count / elapsed:.1f} orders/sec"
+        )
+
+    async def create(self, user, options):
+        handler = OrderHandlerMixin()
+        semaphore = asyncio.Semaphore(options["concurrency"])
+        data = {"name": BENCH_PRODUCT, "price": "9.99"}
+
+        async def create():
+            async with semaphore:
+                await handler.acreate_order(user, data)
+
+        started = time.perf_counter()
+        await asyncio.gather(*(create() for _ in range(options["orders"])))
+        return time.perf_counter() - started
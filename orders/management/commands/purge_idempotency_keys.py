@@ -0,0 +1,25 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from orders.models import IdempotencyKey
+
+
+class Command(BaseCommand):
+    help = "Delete stored idempotency keys older than ORDERS_IDEMPOTENCY_TTL"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=5000)
+
+    def handle(self, *args, **options):
+        cutoff = timezone.now() - timedelta(seconds=settings.ORDERS_IDEMPOTENCY_TTL)
+        expired = IdempotencyKey.objects.filter(created_at__lt=cutoff)
+        total = 0
+        while True:
+            batch = list(expired.values_list("pk", flat=True)[: options["batch_size"]])
+            if not batch:
+                break
+            total += IdempotencyKey.objects.filter(pk__in=batch).delete()[0]
+        self.stdout.write(f"Deleted {total} idempotency keys")
@@ -0,0 +1,53 @@
+import asyncio
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from orders.outbox import purge_relayed, relay_pending
+
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    help = (
+        "Publish pending order events from the outbox table to the Redis stream "
+        "and the websocket groups, at least once, in batches"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=500)
+        parser.add_argument(
+            "--interval", type=float, default=0.2, help="Idle poll interval (s)"
+        )
+        parser.add_argument(
+            "--once", action="store_true", help="Drain the outbox and exit"
+        )
+
+    def handle(self, *args, **options):
+        loop = asyncio.new_event_loop()
+        retention = timedelta(hours=settings.ORDERS_OUTBOX_RETENTION_HOURS)
+        try:
+            while True:
+                try:
+                    relayed = relay_pending(options["batch_size"], loop)
+                except Exception as e:
+                    #* the batch stays pending and is retried on the next pass
+                    logger.error(f"Order event relay failed: {e}")
+                    relayed = 0
+                    if options["once"]:
+                        raise
+                if relayed:
+                    continue
+                purged = purge_relayed(timezone.now() - retention)
+                if purged:
+                    logger.info(f"Purged {purged} relayed order events")
+                if options["once"]:
+                    return
+                time.sleep(options["interval"])
+        finally:
+            loop.close()
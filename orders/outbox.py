@@ -0,0 +1,76 @@
+import logging
+
+from channels.layers import get_channel_layer
+from django.db import transaction
+from django.utils import timezone
+
+from .events import publish_events
+from .groups import groups_for_order
+from .models import OrderEvent
+
+logger = logging.getLogger(__name__)
+
+
+#* websocket payload of a new order, items as (product name, quantity) pairs
+def order_payload(order, user, items):
+    return {
+        "id": order.id,
+        "user": f"{user.full_name} ({user.phone})",
+        "created_at": order.created_at.isoformat(),
+        "items": [
+            {"product_name": name, "quantity": quantity} for name, quantity in items
+        ],
+    }
+
+
+#* must run inside the transaction that creates the orders
+def record_order_events(payloads):
+    OrderEvent.objects.bulk_create(
+        [
+            OrderEvent(order_id=payload["id"], user=user, payload=payload)
+            for user, payload in payloads
+        ]
+    )
+
+
+#* stream first (ids become event_id), then one group_send per interested group;
+#* any failure propagates so the batch stays pending and is retried. A retried
+#* batch is XADDed again under new ids, so the order id, not event_id, is what
+#* identifies a duplicate
+async def publish_batch(events):
+    channel_layer = get_channel_layer()
+    published = await publish_events(
+        [(event.user_id, event.payload) for event in events]
+    )
+    for event, (event_id, frame) in zip(events, published):
+        message = {
+            "type": "send_order",
+            "id": event.order_id,
+            "event_id": event_id,
+            "frame": frame,
+        }
+        for group in groups_for_order(event.user_id, event.order_id):
+            await channel_layer.group_send(group, message)
+
+
+#* relays one batch of pending events on the given event loop, returns how many
+#* were published; rows are locked with SKIP LOCKED so relays can run side by side
+def relay_pending(batch_size, loop):
+    with transaction.atomic():
+        events = list(
+            OrderEvent.objects.filter(relayed_at__isnull=True)
+            .select_for_update(skip_locked=True)
+            .order_by("id")[:batch_size]
+        )
+        if not events:
+            return 0
+        loop.run_until_complete(publish_batch(events))
+        OrderEvent.objects.filter(pk__in=[event.pk for event in events]).update(
+            relayed_at=timezone.now()
+        )
+    logger.info(f"Relayed {len(events)} order events")
+    return len(events)
+
+
+def purge_relayed(before):
+    return OrderEvent.objects.filter(relayed_at__lt=before).delete()[0]
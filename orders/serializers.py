@@ -1,20 +1,78 @@
+import uuid
+
+from django.db import transaction
 from rest_framework import serializers
 from products.models import Product
 from django.contrib.auth import get_user_model
 from orders.models import Order, OrderItem
+from products import rollup
+from orders.outbox import order_payload, record_order_events
 
 User = get_user_model()
 
 
 class OrderItemSerializer(serializers.ModelSerializer):
     product_name = serializers.CharField(source="product.name", read_only=True)
-    product_id = serializers.PrimaryKeyRelatedField(
-        queryset=Product.objects.all(), source="product", write_only=True
-    )
+    #* resolved to Product instances by OrderSerializer with a single IN query
+    product_id = serializers.UUIDField(source="product", write_only=True)
 
     class Meta:
         model = OrderItem
-        fields = ["product_id", "product_name", "quantity"]
+        fields = ["product_id", "product_name", "quantity", "unit_price"]
+        read_only_fields = ["unit_price"]
+
+
+def item_names(items_data):
+    return [(item["product"].name, item.get("quantity", 1)) for item in items_data]
+
+
+def build_order_items(order, items_data):
+    return [
+        OrderItem(order=order, unit_price=item["product"].sale_price, **item)
+        for item in items_data
+    ]
+
+
+#* validates and inserts a whole batch of orders with a constant number of queries
+class BulkOrderListSerializer(serializers.ListSerializer):
+    def to_internal_value(self, data):
+        if isinstance(data, list):
+            product_ids = set()
+            for order_data in data:
+                items = (
+                    order_data.get("items") if isinstance(order_data, dict) else None
+                )
+                for item in items if isinstance(items, list) else []:
+                    try:
+                        product_ids.add(uuid.UUID(str(item.get("product_id"))))
+                    except (AttributeError, ValueError):
+                        continue
+            self._context["products"] = Product.objects.in_bulk(product_ids)
+        return super().to_internal_value(data)
+
+    def create(self, validated_data):
+        items_by_order = [attrs.pop("items") for attrs in validated_data]
+        with transaction.atomic():
+            orders = Order.objects.bulk_create(
+                [Order(**attrs) for attrs in validated_data]
+            )
+            OrderItem.objects.bulk_create(
+                [
+                    item
+                    for order, items_data in zip(orders, items_by_order)
+                    for item in build_order_items(order, items_data)
+                ]
+            )
+            paid = [order.pk for order in orders if order.is_paid]
+            if paid:
+                rollup.apply_orders(paid)
+            record_order_events(
+                [
+                    (order.user, order_payload(order, order.user, item_names(items)))
+                    for order, items in zip(orders, items_by_order)
+                ]
+            )
+        return orders
 
 
 class OrderSerializer(serializers.ModelSerializer):
@@ -24,10 +82,39 @@ class OrderSerializer(serializers.ModelSerializer):
     class Meta:
         model = Order
         fields = ["id", "user", "created_at", "is_paid", "items"]
+        list_serializer_class = BulkOrderListSerializer
+
+    def validate_items(self, items):
+        products = self.context.get("products")
+        if products is None:
+            products = Product.objects.in_bulk({item["product"] for item in items})
+
+        errors = []
+        for item in items:
+            product = products.get(item["product"])
+            if product is None:
+                errors.append(
+                    {
+                        "product_id": [
+                            f'Invalid pk "{item["product"]}" - object does not exist.'
+                        ]
+                    }
+                )
+            else:
+                item["product"] = product
+                errors.append({})
+        if any(errors):
+            raise serializers.ValidationError(errors)
+        return items
 
     def create(self, validated_data):
         items_data = validated_data.pop("items")
-        order = Order.objects.create(**validated_data)
-        for item_data in items_data:
-            OrderItem.objects.create(order=order, **item_data)
-        return order
\ No newline at end of file
+        with transaction.atomic():
+            order = Order.objects.create(**validated_data)
+            OrderItem.objects.bulk_create(build_order_items(order, items_data))
+            if order.is_paid:
+                rollup.apply_orders([order.pk])
+            record_order_events(
+                [(order.user, order_payload(order, order.user, item_names(items_data)))]
+            )
+        return order
@@ -0,0 +1,104 @@
+from django.test import TestCase
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from orders.models import Order, OrderItem
+from orders.views import OrderViewSet
+from products.models import Product, ProductDailySales
+from users.models import User
+
+
+#* list and retrieve must cost a fixed number of queries, however many orders,
+#* items and products are involved
+class OrderQueryCountTests(TestCase):
+    #* orders + user (JOIN), then items + product (prefetch with JOIN)
+    LIST_QUERIES = 2
+    RETRIEVE_QUERIES = 2
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(
+            phone="+99361000000", password="x", full_name="Query count"
+        )
+        cls.factory = APIRequestFactory()
+
+    def create_orders(self, orders, items):
+        products = [
+            Product.objects.create(name=f"product {i}", price=10 + i)
+            for i in range(items)
+        ]
+        for _ in range(orders):
+            order = Order.objects.create(user=self.user)
+            OrderItem.objects.bulk_create(
+                OrderItem(order=order, product=product, unit_price=product.price)
+                for product in products
+            )
+        return order
+
+    def get(self, actions, **kwargs):
+        request = self.factory.get("/orders/")
+        force_authenticate(request, user=self.user)
+        response = OrderViewSet.as_view(actions)(request, **kwargs)
+        response.render()
+        self.assertEqual(response.status_code, 200)
+        return response
+
+    def test_list_single_order(self):
+        self.create_orders(orders=1, items=1)
+        with self.assertNumQueries(self.LIST_QUERIES):
+            response = self.get({"get": "list"})
+        self.assertEqual(len(response.data["results"]), 1)
+
+    def test_list_many_orders(self):
+        self.create_orders(orders=10, items=5)
+        with self.assertNumQueries(self.LIST_QUERIES):
+            response = self.get({"get": "list"})
+        self.assertEqual(len(response.data["results"]), 10)
+        self.assertEqual(len(response.data["results"][0]["items"]), 5)
+
+    def test_retrieve_single_item(self):
+        order = self.create_orders(orders=1, items=1)
+        with self.assertNumQueries(self.RETRIEVE_QUERIES):
+            self.get({"get": "retrieve"}, pk=order.pk)
+
+    def test_retrieve_many_items(self):
+        order = self.create_orders(orders=1, items=10)
+        with self.assertNumQueries(self.RETRIEVE_QUERIES):
+            response = self.get({"get": "retrieve"}, pk=order.pk)
+        self.assertEqual(len(response.data["items"]), 10)
+
+
+#* a paid/unpaid transition reaches the sales rollup once, however many stale
+#* copies of the order are saved with it
+class OrderPaidRollupTests(TestCase):
+    def setUp(self):
+        user = User.objects.create_user(
+            phone="+99361000001", password="x", full_name="Rollup"
+        )
+        product = Product.objects.create(name="product", price=10)
+        self.order = Order.objects.create(user=user)
+        OrderItem.objects.create(
+            order=self.order, product=product, quantity=3, unit_price=10
+        )
+
+    def rollup_quantity(self):
+        return sum(ProductDailySales.objects.values_list("quantity", flat=True))
+
+    def save_copies(self, is_paid, copies=2):
+        orders = [Order.objects.get(pk=self.order.pk) for _ in range(copies)]
+        for order in orders:
+            order.is_paid = is_paid
+            order.save()
+
+    def test_concurrent_paid_counts_once(self):
+        self.save_copies(is_paid=True)
+        self.assertEqual(self.rollup_quantity(), 3)
+
+    def test_concurrent_unpaid_removes_once(self):
+        self.save_copies(is_paid=True)
+        self.save_copies(is_paid=False)
+        self.assertEqual(self.rollup_quantity(), 0)
+
+    def test_save_without_is_paid_field(self):
+        self.order.is_paid = True
+        self.order.save(update_fields=["user"])
+        self.assertEqual(self.rollup_quantity(), 0)
@@ -1,70 +1,120 @@
+import json
 import logging
 from .models import Order, OrderItem
 from products.models import Product
-from channels.layers import get_channel_layer
-from asgiref.sync import async_to_sync
+from channels.db import database_sync_to_async
+from django.db import transaction
+from config.db_router import pin
+from .outbox import order_payload, record_order_events
+from .idempotency import request_hash, run_once
+from .serializers import OrderSerializer
 
 logger = logging.getLogger(__name__)
 
 
 class OrderHandlerMixin:
-    #* Creating an order with a product and sending it via WebSocket
-    def create_order(self, user, data):
-        logger.info("=== START CREATE ORDER ===")
-        logger.info(f"User: {user}")
+    #* Validate the message and write the order, its items and the order event in
+    #* one transaction; the event is broadcast later by relay_order_events
+    def write_order(self, user, data):
+        if "items" in data:
+            return self.write_items_order(user, data["items"])
+        return self.write_product_order(user, data)
 
-        try:
-            name = data.get("name")
-            price = float(data.get("price", 0))
-            special_price = data.get("special_price")
-            if not name or price <= 0:
-                logger.error("Invalid order data: name or price missing/invalid")
-                return None, "Invalid order data"
+    #* items as [{"product_id": ..., "quantity": ...}], resolved in one query
+    def write_items_order(self, user, items):
+        if not isinstance(items, list) or not items:
+            logger.error("Invalid order data: items missing/empty")
+            raise ValueError("Invalid order data")
+        serializer = OrderSerializer(data={"items": items})
+        if not serializer.is_valid():
+            logger.error(f"Invalid order items: {serializer.errors}")
+            raise ValueError(f"Invalid order items: {json.dumps(serializer.errors)}")
+        order = serializer.save(user=user)
+        logger.info(f"Order created with ID: {order.id}")
+        pin(user)
+        return order
+
+    #* legacy message with a single product name and price; an existing product
+    #* with the same name, price and special price is reused instead of adding a
+    #* catalogue row
+    def write_product_order(self, user, data):
+        name = data.get("name")
+        price = float(data.get("price", 0))
+        special_price = data.get("special_price")
+        if special_price is not None:
+            special_price = float(special_price)
+        if not name or price <= 0:
+            logger.error("Invalid order data: name or price missing/invalid")
+            raise ValueError("Invalid order data")
 
-            #* create product
-            product = Product.objects.create(
-                name=name,
-                price=price,
-                special_price=float(special_price)
-                if special_price is not None
-                else None,
+        with transaction.atomic():
+            product = (
+                Product.objects.filter(
+                    name=name, price=price, special_price=special_price
+                )
+                .order_by("created_at", "id")
+                .first()
             )
-            logger.info(f"Created product: {product.name}")
+            if product is None:
+                product = Product.objects.create(
+                    name=name, price=price, special_price=special_price
+                )
+                logger.info(f"Created product: {product.name}")
 
             #* make order
             order = Order.objects.create(user=user)
             logger.info(f"Order created with ID: {order.id}")
 
             #* create order item
-            OrderItem.objects.create(order=order, product=product, quantity=1)
+            OrderItem.objects.create(
+                order=order,
+                product=product,
+                quantity=1,
+                unit_price=product.sale_price,
+            )
             logger.info(f"Added order item: 1x {product.name}")
 
-            #* Prepare order data for WebSocket
-            user_identifier = f"{user.full_name} ({user.phone})"
-            order_data = {
-                "id": order.id,
-                "user": user_identifier,
-                "created_at": order.created_at.isoformat(),
-                "items": [{"product_name": product.name, "quantity": 1}],
-            }
-            logger.info(f"Order data: {order_data}")
+            order_data = order_payload(order, user, [(product.name, 1)])
+            record_order_events([(user, order_data)])
+        pin(user)
+        logger.info(f"Order data: {order_data}")
+        return order
+
+    #* Writes the order once per idempotency_key (when given), returns its id
+    def write_order_once(self, user, data):
+        key = data.get("idempotency_key")
+        if key is None:
+            return self.write_order(user, data).id
+
+        def write():
+            return 201, {"id": self.write_order(user, data).id}
 
-            #* Send order data via WebSocket
-            try:
-                channel_layer = get_channel_layer()
-                if channel_layer:
-                    message = {"type": "send_order", "order": order_data}
-                    async_to_sync(channel_layer.group_send)("orders", message)
-                    logger.info("WebSocket message sent successfully")
-                else:
-                    logger.error("Channel layer not available")
-                    return None, "Channel layer not available"
-            except Exception as e:
-                logger.error(f"WebSocket error: {e}")
-                return None, f"WebSocket error: {e}"
+        body = {
+            name: value for name, value in data.items() if name != "idempotency_key"
+        }
+        _, response, _ = run_once(user, key, request_hash(body), write)
+        return response["id"]
 
-            logger.info("=== END CREATE ORDER ===")
-            return order, None
+    #* Creating an order from async code in one thread hop, returns (order id, error)
+    async def acreate_order(self, user, data):
+        logger.info("=== START CREATE ORDER ===")
+        logger.info(f"User: {user}")
+        try:
+            order_id = await database_sync_to_async(self.write_order_once)(user, data)
+        except Exception as e:
+            logger.error(f"Order creation error: {e}")
+            return None, str(e)
+        logger.info("=== END CREATE ORDER ===")
+        return order_id, None
+
+    #* Creating an order with a product (sync callers), returns (order id, error)
+    def create_order(self, user, data):
+        logger.info("=== START CREATE ORDER ===")
+        logger.info(f"User: {user}")
+        try:
+            order_id = self.write_order_once(user, data)
         except Exception as e:
             logger.error(f"Order creation error: {e}")
             return None, str(e)
+        logger.info("=== END CREATE ORDER ===")
+        return order_id, None
@@ -1,7 +1,22 @@
-from rest_framework import viewsets
-from rest_framework.permissions import IsAuthenticated
-from orders.models import Order
+from datetime import date
+
+from django.conf import settings
+from rest_framework import status, viewsets
+from rest_framework.decorators import action
+from rest_framework.permissions import IsAdminUser, IsAuthenticated
+from rest_framework.response import Response
+from django.db import transaction
+from django.db.models import Prefetch
+from orders.models import Order, OrderItem
 from .serializers import OrderSerializer
+from .idempotency import IdempotencyError, request_hash, run_once
+from .export import (
+    EXPORT_FORMATS,
+    ORDER_CSV_FIELDS,
+    order_item_rows,
+    order_rows,
+    stream_export,
+)
 
 import logging
 
@@ -14,9 +29,95 @@ class OrderViewSet(viewsets.ModelViewSet):
     permission_classes = [IsAuthenticated]
 
     def get_queryset(self):
+        queryset = self.get_base_queryset()
         if self.request.user.is_superuser:
-            return Order.objects.all()
-        return Order.objects.filter(user=self.request.user)
+            return queryset
+        return queryset.filter(user=self.request.user)
+
+    #* load users, items and their products up front to avoid N+1 queries
+    def get_base_queryset(self):
+        return Order.objects.select_related("user").prefetch_related(
+            Prefetch("items", queryset=OrderItem.objects.select_related("product"))
+        )
 
     def perform_create(self, serializer):
         serializer.save(user=self.request.user)
+
+    #* the paid flip and its rollup update commit together
+    def perform_update(self, serializer):
+        with transaction.atomic():
+            serializer.save()
+
+    #* with an Idempotency-Key header a retried create returns the stored response
+    def create(self, request, *args, **kwargs):
+        key = request.headers.get("Idempotency-Key")
+        if key is None:
+            return super().create(request, *args, **kwargs)
+
+        def write():
+            response = super(OrderViewSet, self).create(request, *args, **kwargs)
+            return response.status_code, response.data
+
+        try:
+            status_code, data, replayed = run_once(
+                request.user, key, request_hash(request.data), write
+            )
+        except IdempotencyError as e:
+            return Response(
+                {"error": str(e)}, status=status.HTTP_422_UNPROCESSABLE_ENTITY
+            )
+        response = Response(data, status=status_code)
+        if replayed:
+            response["Idempotent-Replayed"] = "true"
+        return response
+
+    #* batched ingest for the POS sync job
+    @action(detail=False, methods=["post"], url_path="bulk")
+    def bulk(self, request):
+        serializer = self.get_serializer(
+            data=request.data, many=True, max_length=settings.ORDERS_BULK_MAX_SIZE
+        )
+        serializer.is_valid(raise_exception=True)
+        orders = serializer.save(user=request.user)
+        logger.info(f"Bulk created {len(orders)} orders for user: {request.user}")
+        return Response(
+            {"created": len(orders), "ids": [order.id for order in orders]},
+            status=status.HTTP_201_CREATED,
+        )
+
+    #* streams the full order history with items as ndjson or csv
+    @action(
+        detail=False,
+        methods=["get"],
+        url_path="export",
+        permission_classes=[IsAdminUser],
+    )
+    def export(self, request):
+        output = request.query_params.get("output", "ndjson")
+        if output not in EXPORT_FORMATS:
+            return Response(
+                {"error": "Invalid output. Use ndjson or csv."},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        queryset = self.get_base_queryset().order_by("id")
+        try:
+            if request.query_params.get("start"):
+                start = date.fromisoformat(request.query_params["start"])
+                queryset = queryset.filter(created_at__date__gte=start)
+            if request.query_params.get("end"):
+                end = date.fromisoformat(request.query_params["end"])
+                queryset = queryset.filter(created_at__date__lte=end)
+        except ValueError:
+            return Response(
+                {"error": "Invalid date format. Use YYYY-MM-DD."},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        logger.info(f"Order export ({output}) started by user: {request.user}")
+        rows = order_rows(queryset)
+        if output == "csv":
+            return stream_export(
+                request, order_item_rows(rows), ORDER_CSV_FIELDS, output, "orders"
+            )
+        return stream_export(request, rows, None, output, "orders")
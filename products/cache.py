@@ -0,0 +1,215 @@
+import hashlib
+import math
+import os
+import random
+import threading
+import time
+from contextlib import nullcontext
+
+from django.conf import settings
+from django.core.cache import cache
+from django_redis import get_redis_connection
+
+from config.db_router import read_from_primary
+
+from .local_cache import LocalCache
+
+import logging
+
+logger = logging.getLogger(__name__)
+
+LIST_VERSION_KEY = "products:list:version"
+INVALIDATION_CHANNEL = "products:invalidate"
+#* set for REPLICA_PIN_SECONDS after an invalidation, while replicas may lag
+DIRTY_KEY = "products:dirty"
+
+#* in-process tier in front of Redis, kept coherent through pub/sub
+local_cache = LocalCache(
+    max_entries=settings.PRODUCT_LOCAL_CACHE_MAX_ENTRIES,
+    max_bytes=settings.PRODUCT_LOCAL_CACHE_MAX_BYTES,
+    timeout=settings.PRODUCT_LOCAL_CACHE_TIMEOUT,
+)
+_listener_pid = None
+_listener_lock = threading.Lock()
+
+
+def _version(key, timeout=None):
+    version = cache.get(key)
+    if version is None:
+        #* start from a timestamp so a lost version key never reuses an old generation
+        cache.add(key, int(time.time() * 1000), timeout=timeout)
+        version = cache.get(key)
+    return version
+
+
+def _bump_version(key, timeout=None):
+    try:
+        cache.incr(key)
+        if timeout is not None:
+            cache.touch(key, timeout)
+    except ValueError:
+        cache.add(key, int(time.time() * 1000), timeout=timeout)
+
+
+#* generation number shared by every cached list variant
+def list_version():
+    return _version(LIST_VERSION_KEY)
+
+
+def _detail_version_key(pk):
+    return f"products:detail:{pk}:version"
+
+
+#* per-product version keys expire with the entries they version, so lookups of
+#* unknown ids do not leave keys behind; an expired key restarts from a timestamp
+def _detail_version_timeout():
+    return settings.PRODUCT_CACHE_TIMEOUT + settings.PRODUCT_CACHE_STALE_TIMEOUT
+
+
+def _url_hash(request):
+    return hashlib.md5(request.build_absolute_uri().encode()).hexdigest()
+
+
+#* image URLs are absolute, so details are cached per scheme and host
+def _origin_hash(request):
+    return hashlib.md5(request.build_absolute_uri("/").encode()).hexdigest()
+
+
+#* one generation per product covers the detail entries of every origin
+def detail_key(pk, origin):
+    version = _version(_detail_version_key(pk), _detail_version_timeout())
+    return f"products:detail:{pk}:{version}:{origin}"
+
+
+def _invalidate_local(pk):
+    local_cache.delete_prefix("list:")
+    local_cache.delete_prefix(f"detail:{pk}:")
+
+
+#* O(1) invalidation: bump the list generation and the product's detail generation
+def invalidate(pk):
+    cache.set(DIRTY_KEY, 1, timeout=settings.REPLICA_PIN_SECONDS)
+    _bump_version(LIST_VERSION_KEY)
+    _bump_version(_detail_version_key(pk), _detail_version_timeout())
+    _invalidate_local(pk)
+    try:
+        get_redis_connection("default").publish(INVALIDATION_CHANNEL, str(pk))
+    except NotImplementedError:
+        pass
+    except Exception as e:
+        logger.error(f"Failed to publish product cache invalidation: {e}")
+    logger.debug(f"Product cache invalidated for product {pk}")
+
+
+def _listen():
+    while True:
+        try:
+            pubsub = get_redis_connection("default").pubsub(
+                ignore_subscribe_messages=True
+            )
+            pubsub.subscribe(INVALIDATION_CHANNEL)
+            #* messages may have been missed while (re)connecting
+            local_cache.clear()
+            for message in pubsub.listen():
+                _invalidate_local(message["data"].decode())
+        except Exception as e:
+            logger.error(f"Product cache invalidation listener error: {e}")
+            local_cache.clear()
+            time.sleep(1)
+
+
+#* one listener thread per process, started lazily so it survives worker forks
+def _ensure_listener():
+    global _listener_pid
+    if _listener_pid == os.getpid() or local_cache.max_entries <= 0:
+        return
+    with _listener_lock:
+        if _listener_pid == os.getpid():
+            return
+        try:
+            get_redis_connection("default")
+        except NotImplementedError:
+            #* not a Redis cache backend, rely on the local TTL only
+            _listener_pid = os.getpid()
+            return
+        threading.Thread(
+            target=_listen, name="product-cache-invalidation", daemon=True
+        ).start()
+        _listener_pid = os.getpid()
+
+
+#* XFetch: refresh early with a probability that grows as expiry approaches
+def _should_refresh(entry):
+    jitter = -math.log(1.0 - random.random())
+    early = entry["delta"] * settings.PRODUCT_CACHE_REFRESH_BETA * jitter
+    return time.time() + early >= entry["expires"]
+
+
+def _rebuild(key, build):
+    started = time.monotonic()
+    #* right after an invalidation a replica may still serve the old rows, and
+    #* an entry built from them would outlive the invalidation
+    dirty = cache.get(DIRTY_KEY) is not None
+    with read_from_primary() if dirty else nullcontext():
+        content = build()
+    entry = {
+        "content": content,
+        "expires": time.time() + settings.PRODUCT_CACHE_TIMEOUT,
+        "delta": time.monotonic() - started,
+    }
+    #* keep the entry past its expiry so it can be served stale during a rebuild
+    timeout = settings.PRODUCT_CACHE_TIMEOUT + settings.PRODUCT_CACHE_STALE_TIMEOUT
+    cache.set(key, entry, timeout)
+    return content
+
+
+def cached_list(request, build):
+    url = _url_hash(request)
+    return cached_content(
+        f"list:{url}", lambda: f"products:list:{list_version()}:{url}", build
+    )
+
+
+def cached_detail(request, pk, build):
+    origin = _origin_hash(request)
+    return cached_content(
+        f"detail:{pk}:{origin}", lambda: detail_key(pk, origin), build
+    )
+
+
+#* rendered JSON bytes from the local LRU, then Redis; one worker rebuilds a
+#* missing/expiring entry
+def cached_content(local_key, make_key, build):
+    content = local_cache.get(local_key)
+    if content is not None:
+        return content
+    _ensure_listener()
+
+    content = _redis_content(make_key(), build)
+    local_cache.set(local_key, content, size=len(content))
+    return content
+
+
+def _redis_content(key, build):
+    entry = cache.get(key)
+    if entry is not None and not _should_refresh(entry):
+        return entry["content"]
+
+    lock_key = f"{key}:lock"
+    if cache.add(lock_key, 1, timeout=settings.PRODUCT_CACHE_LOCK_TIMEOUT):
+        try:
+            return _rebuild(key, build)
+        finally:
+            cache.delete(lock_key)
+
+    #* another worker is rebuilding: serve the stale copy or wait briefly for it
+    if entry is not None:
+        return entry["content"]
+    deadline = time.monotonic() + settings.PRODUCT_CACHE_LOCK_WAIT
+    while time.monotonic() < deadline:
+        time.sleep(0.05)
+        entry = cache.get(key)
+        if entry is not None:
+            return entry["content"]
+    logger.warning(f"Timed out waiting for cache rebuild of {key}")
+    return _rebuild(key, build)
@@ -1,12 +1,42 @@
+from django.contrib.postgres.search import TrigramSimilarity
+from django.db import connections
+from django.db.models import Case, FloatField, Q, Value, When
+from django.db.models.functions import Greatest
 from django_filters import rest_framework as filters
 from products.models import Product
 
 
+#* relevance-ranked search backed by the pg_trgm indexes on Product.name
+def search_products(queryset, term):
+    if connections[queryset.db].vendor != "postgresql":
+        return queryset.filter(name__icontains=term).annotate(
+            search_rank=Value(1.0, output_field=FloatField())
+        )
+    return queryset.annotate(
+        search_rank=Greatest(
+            TrigramSimilarity("name", term),
+            #* prefix matches rank first, for autocomplete-style queries
+            Case(
+                When(name__istartswith=term, then=Value(1.0)),
+                default=Value(0.0),
+                output_field=FloatField(),
+            ),
+        )
+    ).filter(Q(name__trigram_similar=term) | Q(name__icontains=term))
+
+
 class ProductFilter(filters.FilterSet):
     name = filters.CharFilter(lookup_expr="icontains")
-    price_min = filters.NumberFilter(field_name="price", lookup_expr="gte")
-    price_max = filters.NumberFilter(field_name="price", lookup_expr="lte")
+    search = filters.CharFilter(method="filter_search")
+    price_min = filters.NumberFilter(field_name="effective_price", lookup_expr="gte")
+    price_max = filters.NumberFilter(field_name="effective_price", lookup_expr="lte")
 
     class Meta:
         model = Product
-        fields = ["name", "price_min", "price_max"]
+        fields = ["name", "search", "price_min", "price_max"]
+
+    def filter_search(self, queryset, name, value):
+        value = value.strip()
+        if not value:
+            return queryset
+        return search_products(queryset, value)
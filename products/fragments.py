@@ -0,0 +1,40 @@
+import hashlib
+
+from django.conf import settings
+from django.core.cache import cache
+
+from config.renderers import dumps
+from .serializers import ProductSerializer
+
+
+#* fragments are keyed by product version, so a save retires the old one
+def fragment_key(product, origin):
+    version = int(product.updated_at.timestamp() * 1_000_000)
+    return f"products:fragment:{origin}:{product.pk}:{version}"
+
+
+def _origin(context):
+    #* image_url is rendered as an absolute URL, so fragments vary by host
+    request = context.get("request")
+    uri = request.build_absolute_uri("/") if request else ""
+    return hashlib.md5(uri.encode()).hexdigest()[:8]
+
+
+def render_product(product, context):
+    return dumps(ProductSerializer(product, context=context).data)
+
+
+#* JSON array of pre-rendered products, serializing only those not yet cached
+def render_products(products, context):
+    origin = _origin(context)
+    keys = {fragment_key(product, origin): product for product in products}
+    fragments = cache.get_many(list(keys))
+    missing = {
+        key: render_product(product, context)
+        for key, product in keys.items()
+        if key not in fragments
+    }
+    if missing:
+        cache.set_many(missing, settings.PRODUCT_FRAGMENT_TIMEOUT)
+        fragments.update(missing)
+    return b"[" + b",".join(fragments[key] for key in keys) + b"]"
@@ -0,0 +1,49 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count
+
+from products import cache
+from products.models import Product
+
+
+class Command(BaseCommand):
+    help = (
+        "Give products sharing a created_at value distinct timestamps, so cursor "
+        "pagination never falls back to OFFSET on ties (run once after the "
+        "created_at column is added)"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=1000)
+
+    def handle(self, *args, **options):
+        ties = (
+            Product.objects.values("created_at")
+            .annotate(count=Count("id"))
+            .filter(count__gt=1)
+            .order_by()
+        )
+        updated = []
+        for tie in ties.iterator():
+            products = Product.objects.filter(created_at=tie["created_at"]).order_by(
+                "id"
+            )
+            #* keep the first, step the others back one microsecond each
+            for offset, product in enumerate(products.iterator()):
+                if not offset:
+                    continue
+                product.created_at = tie["created_at"] - timedelta(microseconds=offset)
+                updated.append(product)
+
+        with transaction.atomic():
+            Product.objects.bulk_update(
+                updated, ["created_at"], batch_size=options["batch_size"]
+            )
+        if updated:
+            #* bumps the list generation; created_at is not part of the detail payload
+            cache.invalidate(updated[0].pk)
+        self.stdout.write(
+            self.style.SUCCESS(f"Updated created_at of {len(updated)} products")
+        )
@@ -0,0 +1,105 @@
+import random
+import statistics
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+
+from orders.models import OrderItem
+from products import cache
+from products.filters import ProductFilter
+from products.models import Product, ProductDailySales
+
+BENCH_PREFIX = "bench-"
+WORDS = [
+    "apple", "banana", "cherry", "coffee", "tea", "milk", "bread", "butter",
+    "cheese", "yogurt", "water", "juice", "rice", "pasta", "sugar", "salt",
+    "pepper", "honey", "chocolate", "cookie", "shampoo", "soap", "towel", "lamp",
+]  # fmt: skip
+
+
+class Command(BaseCommand):
+    help = "Compare the trigram search filter with the old icontains name filter"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--rows", type=int, default=1_000_000)
+        parser.add_argument("--term", default="choco")
+        parser.add_argument("--repeat", type=int, default=20)
+        parser.add_argument("--batch-size", type=int, default=10_000)
+        parser.add_argument("--explain", action="store_true")
+        parser.add_argument(
+            "--cleanup", action="store_true", help="Delete seeded products and exit"
+        )
+
+    def handle(self, *args, **options):
+        if options["cleanup"]:
+            deleted = self.cleanup(options["batch_size"])
+            self.stdout.write(f"Deleted {deleted} benchmark products")
+            return
+
+        self.seed(options["rows"], options["batch_size"])
+        term = options["term"]
+        with connection.cursor() as cursor:
+            cursor.execute("ANALYZE products_product")
+
+        old = Product.objects.filter(name__icontains=term).order_by("-created_at")
+        new = ProductFilter({"search": term}, queryset=Product.objects.all()).qs
+        new = new.order_by("-search_rank", "-created_at")
+
+        #* the trigram GIN indexes are only reachable through bitmap scans, so the
+        #* baseline runs with those off to measure icontains as it was before them
+        runs = (
+            ("icontains", old, "SET LOCAL enable_bitmapscan = off"),
+            ("search", new, None),
+        )
+        for label, queryset, setup in runs:
+            timings = []
+            with transaction.atomic():
+                if setup:
+                    with connection.cursor() as cursor:
+                        cursor.execute(setup)
+                for _ in range(options["repeat"]):
+                    started = time.perf_counter()
+                    list(queryset[:50])
+                    timings.append((time.perf_counter() - started) * 1000)
+                if options["explain"]:
+                    self.stdout.write(queryset[:50].explain(analyze=True))
+            self.stdout.write(
+                f"{label:>10}: median {statistics.median(timings):.2f} ms, "
+                f"p95 {sorted(timings)[int(len(timings) * 0.95) - 1]:.2f} ms"
+            )
+
+    #* raw batched deletes: an ORM delete would load every row and queue one cache
+    #* invalidation per product through the post_delete receiver
+    def cleanup(self, batch_size):
+        seeded = Product.objects.filter(name__startswith=BENCH_PREFIX)
+        deleted = 0
+        while ids := list(seeded.values_list("id", flat=True)[:batch_size]):
+            with transaction.atomic():
+                for queryset in (
+                    OrderItem.objects.filter(product_id__in=ids),
+                    ProductDailySales.objects.filter(product_id__in=ids),
+                    Product.objects.filter(id__in=ids),
+                ):
+                    queryset._raw_delete(queryset.db)
+            deleted += len(ids)
+            last_id = ids[-1]
+        if deleted:
+            #* one bump of the list generation covers every deleted product
+            cache.invalidate(last_id)
+        return deleted
+
+    def seed(self, rows, batch_size):
+        existing = Product.objects.filter(name__startswith=BENCH_PREFIX).count()
+        missing = rows - existing
+        while missing > 0:
+            size = min(batch_size, missing)
+            Product.objects.bulk_create(
+                Product(
+                    name=f"{BENCH_PREFIX}{' '.join(random.sample(WORDS, 3))} {i}",
+                    price=random.randint(100, 100_000) / 100,
+                )
+                for i in range(size)
+            )
+            missing -= size
+            self.stdout.write(f"Seeded {rows - missing}/{rows} products")
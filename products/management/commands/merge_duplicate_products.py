@@ -0,0 +1,59 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count
+
+from orders.models import OrderItem
+from products import rollup
+from products.models import Product
+
+
+class Command(BaseCommand):
+    help = (
+        "Merge products sharing (name, price, special_price) into the oldest one: "
+        "order items and the daily sales rollup are repointed, the duplicates "
+        "deleted"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--dry-run", action="store_true")
+
+    def handle(self, *args, **options):
+        #* the identity write_product_order reuses products by, so merged rows
+        #* are not created again by the next legacy order
+        groups = (
+            Product.objects.values("name", "price", "special_price")
+            .annotate(count=Count("id"))
+            .filter(count__gt=1)
+            .order_by()
+        )
+        merged = 0
+        for group in groups.iterator():
+            ids = list(
+                Product.objects.filter(
+                    name=group["name"],
+                    price=group["price"],
+                    special_price=group["special_price"],
+                )
+                .order_by("created_at", "id")
+                .values_list("id", flat=True)
+            )
+            keep_id, duplicate_ids = ids[0], ids[1:]
+            self.stdout.write(
+                f"{group['name']} ({group['price']}, {group['special_price']}): "
+                f"keeping {keep_id}, merging {len(duplicate_ids)} duplicates"
+            )
+            if not options["dry_run"]:
+                self.merge(keep_id, duplicate_ids)
+            merged += len(duplicate_ids)
+
+        action = "Would merge" if options["dry_run"] else "Merged"
+        self.stdout.write(self.style.SUCCESS(f"{action} {merged} duplicate products"))
+
+    #* one transaction per (name, price, special_price) group
+    def merge(self, keep_id, duplicate_ids):
+        with transaction.atomic():
+            OrderItem.objects.filter(product_id__in=duplicate_ids).update(
+                product_id=keep_id
+            )
+            rollup.merge_products(keep_id, duplicate_ids)
+            Product.objects.filter(id__in=duplicate_ids).delete()
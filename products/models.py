@@ -1,6 +1,10 @@
+from django.contrib.postgres.indexes import GinIndex, OpClass
 from django.db import models
+from django.db.models.functions import Coalesce, Upper
+from django.utils import timezone
 import uuid
 
+
 class Product(models.Model):
     name = models.CharField(max_length=255)
     price = models.DecimalField(max_digits=10, decimal_places=2)
@@ -11,6 +15,56 @@ class Product(models.Model):
     id = models.UUIDField(
         default=uuid.uuid4, unique=True, editable=False, primary_key=True
     )
+    created_at = models.DateTimeField(default=timezone.now)
+    updated_at = models.DateTimeField(auto_now=True)
+    #* the price the product actually sells at, computed and stored by the database
+    effective_price = models.GeneratedField(
+        expression=Coalesce("special_price", "price"),
+        output_field=models.DecimalField(max_digits=10, decimal_places=2),
+        db_persist=True,
+    )
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["-created_at", "-id"], name="product_created_idx"),
+            models.Index(
+                fields=["effective_price"], name="product_effective_price_idx"
+            ),
+            #* pg_trgm indexes: similarity search on name, (i)contains/prefix on UPPER(name)
+            GinIndex(
+                fields=["name"],
+                opclasses=["gin_trgm_ops"],
+                name="product_name_trgm_idx",
+            ),
+            GinIndex(
+                OpClass(Upper("name"), name="gin_trgm_ops"),
+                name="product_name_upper_trgm_idx",
+            ),
+        ]
 
     def __str__(self):
-        return self.name
\ No newline at end of file
+        return self.name
+
+    @property
+    def sale_price(self):
+        if self.special_price is not None:
+            return self.special_price
+        return self.price
+
+
+#* daily per-product sales rollup backing the stats endpoint
+class ProductDailySales(models.Model):
+    product = models.ForeignKey(
+        Product, related_name="daily_sales", on_delete=models.CASCADE
+    )
+    date = models.DateField()
+    quantity = models.IntegerField(default=0)
+    revenue = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    order_count = models.IntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["date", "product"], name="unique_product_daily_sales"
+            )
+        ]
@@ -0,0 +1,9 @@
+from config.pagination import CreatedAtCursorPagination
+
+
+#* search results are paged by relevance, everything else by creation time
+class ProductCursorPagination(CreatedAtCursorPagination):
+    def get_ordering(self, request, queryset, view):
+        if request.query_params.get("search", "").strip():
+            return ("-search_rank", "-created_at", "-id")
+        return super().get_ordering(request, queryset, view)
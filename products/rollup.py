@@ -0,0 +1,141 @@
+from contextlib import contextmanager
+from contextvars import ContextVar
+from itertools import islice
+
+from django.db import IntegrityError, transaction
+from django.db.models import Count, DecimalField, F, Sum
+from django.db.models.functions import Coalesce, TruncDate
+
+from orders.models import OrderItem
+from .models import ProductDailySales
+
+import logging
+
+logger = logging.getLogger(__name__)
+
+_preserved = ContextVar("rollup_preserved", default=False)
+
+
+#* order deletes inside this block leave the rollup untouched (used by archiving)
+@contextmanager
+def preserve():
+    token = _preserved.set(True)
+    try:
+        yield
+    finally:
+        _preserved.reset(token)
+
+
+def is_preserved():
+    return _preserved.get()
+
+
+def _aggregate(items):
+    #* group order items into (product, day) buckets
+    return (
+        items.annotate(date=TruncDate("order__created_at"))
+        .values("product_id", "date")
+        .annotate(
+            total_quantity=Sum("quantity"),
+            #* items not backfilled yet (unit_price NULL) are valued at the current price
+            total_revenue=Sum(
+                F("quantity") * Coalesce("unit_price", "product__effective_price"),
+                output_field=DecimalField(max_digits=14, decimal_places=2),
+            ),
+            total_orders=Count("order", distinct=True),
+        )
+        .order_by()
+    )
+
+
+def _bump(product_id, date, quantity, revenue, order_count):
+    updated = ProductDailySales.objects.filter(product_id=product_id, date=date).update(
+        quantity=F("quantity") + quantity,
+        revenue=F("revenue") + revenue,
+        order_count=F("order_count") + order_count,
+    )
+    if updated:
+        return
+    try:
+        with transaction.atomic():
+            ProductDailySales.objects.create(
+                product_id=product_id,
+                date=date,
+                quantity=quantity,
+                revenue=revenue,
+                order_count=order_count,
+            )
+    except IntegrityError:
+        #* another worker created the row first, add to it instead
+        _bump(product_id, date, quantity, revenue, order_count)
+
+
+#* add (sign=1) or remove (sign=-1) the items of paid orders from the rollup
+def apply_orders(order_ids, sign=1):
+    rows = _aggregate(OrderItem.objects.filter(order_id__in=order_ids))
+    with transaction.atomic():
+        for row in rows:
+            _bump(
+                row["product_id"],
+                row["date"],
+                sign * row["total_quantity"],
+                sign * row["total_revenue"],
+                sign * row["total_orders"],
+            )
+    logger.debug(f"Sales rollup updated for orders {order_ids} (sign={sign})")
+
+
+#* recompute rollup rows for the given date range from paid orders
+def rebuild(start=None, end=None, batch_size=1000):
+    items = OrderItem.objects.filter(order__is_paid=True)
+    rollup = ProductDailySales.objects.all()
+    if start:
+        items = items.filter(order__created_at__date__gte=start)
+        rollup = rollup.filter(date__gte=start)
+    if end:
+        items = items.filter(order__created_at__date__lte=end)
+        rollup = rollup.filter(date__lte=end)
+
+    rows = (
+        ProductDailySales(
+            product_id=row["product_id"],
+            date=row["date"],
+            quantity=row["total_quantity"],
+            revenue=row["total_revenue"],
+            order_count=row["total_orders"],
+        )
+        for row in _aggregate(items).iterator(chunk_size=batch_size)
+    )
+
+    created = 0
+    with transaction.atomic():
+        rollup.delete()
+        while batch := list(islice(rows, batch_size)):
+            ProductDailySales.objects.bulk_create(batch)
+            created += len(batch)
+    return created
+
+
+#* fold the rollup rows of duplicate products into the kept product; an order
+#* that contained several of the duplicates is counted once per duplicate
+def merge_products(keep_id, duplicate_ids):
+    duplicates = ProductDailySales.objects.filter(product_id__in=duplicate_ids)
+    rows = (
+        duplicates.values("date")
+        .annotate(
+            total_quantity=Sum("quantity"),
+            total_revenue=Sum("revenue"),
+            total_orders=Sum("order_count"),
+        )
+        .order_by()
+    )
+    with transaction.atomic():
+        for row in rows:
+            _bump(
+                keep_id,
+                row["date"],
+                row["total_quantity"],
+                row["total_revenue"],
+                row["total_orders"],
+            )
+        duplicates.delete()
@@ -1,8 +1,63 @@
-from django.db.models.signals import post_save, post_delete
+from functools import partial
+
+from django.db import connections, transaction
+from django.db.models.signals import (
+    post_delete,
+    post_save,
+    pre_delete,
+    pre_migrate,
+    pre_save,
+)
 from django.dispatch import receiver
-from django.core.cache import cache
+from orders.models import Order
 from .models import Product
+from .cache import invalidate
+from . import rollup
+
 
+#* after commit, so a concurrent rebuild can't cache the pre-commit row under
+#* the new generation
 @receiver([post_save, post_delete], sender=Product)
-def invalidate_product_cache(sender, instance, **kwargs):
-    cache.delete("product_list")
\ No newline at end of file
+def invalidate_product_cache(sender, instance, using, **kwargs):
+    transaction.on_commit(partial(invalidate, instance.pk), using=using)
+
+
+#* the paid/unpaid flip is claimed with a conditional UPDATE, so of two
+#* concurrent saves of the same transition only one sees a changed row
+@receiver(pre_save, sender=Order)
+def claim_paid_transition(sender, instance, raw, using, update_fields, **kwargs):
+    instance._paid_transition = False
+    #* new orders are added by the creating code once their items exist
+    if raw or instance._state.adding:
+        return
+    if update_fields is not None and "is_paid" not in update_fields:
+        return
+    instance._paid_transition = bool(
+        Order.objects.using(using)
+        .filter(pk=instance.pk, is_paid=not instance.is_paid)
+        .update(is_paid=instance.is_paid)
+    )
+
+
+#* keep the sales rollup in sync when an order is marked paid/unpaid
+@receiver(post_save, sender=Order)
+def update_sales_rollup(sender, instance, created, **kwargs):
+    if not getattr(instance, "_paid_transition", False):
+        return
+    instance._paid_transition = False
+    rollup.apply_orders([instance.pk], 1 if instance.is_paid else -1)
+
+
+@receiver(pre_delete, sender=Order)
+def remove_deleted_order_from_rollup(sender, instance, **kwargs):
+    if instance.is_paid and not rollup.is_preserved():
+        rollup.apply_orders([instance.pk], -1)
+
+
+#* pg_trgm has to exist before the trigram indexes on Product.name are created
+@receiver(pre_migrate)
+def create_search_extensions(sender, using, **kwargs):
+    if sender.name != "products" or connections[using].vendor != "postgresql":
+        return
+    with connections[using].cursor() as cursor:
+        cursor.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
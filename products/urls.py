@@ -1,10 +1,17 @@
-from django.urls import path
-from .views import ProductViewSet, ProductSalesStatsView
+from django.urls import path, include
+from .views import ProductViewSet, ProductSalesStatsView, ProductSalesStatsExportView
 from rest_framework.routers import DefaultRouter
 
 router = DefaultRouter()
-router.register(r"orders", ProductViewSet, basename="order")
+router.register(r"products", ProductViewSet, basename="product")
 
+#* ahead of the router, whose products/<pk>/ route would match "stats"
 urlpatterns = [
-    path("stats/", ProductSalesStatsView.as_view(), name="products-stats"),
+    path("products/stats/", ProductSalesStatsView.as_view(), name="products-stats"),
+    path(
+        "products/stats/export/",
+        ProductSalesStatsExportView.as_view(),
+        name="products-stats-export",
+    ),
+    path("", include(router.urls)),
 ]
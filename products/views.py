@@ -1,7 +1,10 @@
 from django_filters.rest_framework import DjangoFilterBackend
-from django.views.decorators.cache import cache_page
+from django.http import Http404, HttpResponse
+from django.views.decorators.cache import never_cache
 from django.utils.decorators import method_decorator
 from rest_framework import viewsets
+from rest_framework.decorators import action
+from rest_framework.filters import OrderingFilter
 
 
 from rest_framework.permissions import IsAdminUser
@@ -10,83 +13,158 @@ from rest_framework.views import APIView
 from rest_framework.response import Response
 
 from rest_framework.permissions import AllowAny
-from .models import Product
+from .models import Product, ProductDailySales
 from .filters import ProductFilter
+from .pagination import ProductCursorPagination
+from .cache import cached_detail, cached_list
+from .fragments import render_product, render_products
 from .serializers import ProductSerializer, ProductSalesStatsSerializer
 
-from django.db.models import Sum, F
-from django.db.models.functions import Coalesce
+from django.db.models import Sum
 from django.utils import timezone
-from datetime import timedelta
-from orders.models import OrderItem
+from datetime import date, timedelta
+from config.db_router import ReplicaReadMixin
+from config.renderers import dumps
+from orders.export import EXPORT_CHUNK_SIZE, EXPORT_FORMATS, stream_export
 
 import logging
+import uuid
 
 logger = logging.getLogger(__name__)
 
+AUTOCOMPLETE_LIMIT = 10
+STATS_CSV_FIELDS = ["product_id", "product_name", "total_quantity", "total_revenue"]
 
-class ProductViewSet(viewsets.ModelViewSet):
+
+class ProductViewSet(ReplicaReadMixin, viewsets.ModelViewSet):
     queryset = Product.objects.all()
     serializer_class = ProductSerializer
-    filter_backends = [DjangoFilterBackend]
+    filter_backends = [DjangoFilterBackend, OrderingFilter]
     filterset_class = ProductFilter
+    ordering_fields = ["effective_price", "created_at", "name"]
+    pagination_class = ProductCursorPagination
 
     def get_permissions(self):
         if self.action in ["create", "update", "partial_update", "destroy"]:
             return [IsAdminUser()]
         return [AllowAny()]
 
-    @method_decorator(cache_page(60 * 15))  #! Cache for 15 minutes
+    #! Cached in products.cache (versioned keys), kept out of the site-wide page cache
+    @method_decorator(never_cache)
     def list(self, request, *args, **kwargs):
         logger.debug("ProductViewSet.list called, checking cache")
-        response = super().list(request, *args, **kwargs)
-        logger.debug("ProductViewSet.list response generated")
-        return response
+        content = cached_list(request, self.render_list)
+        return HttpResponse(content, content_type="application/json")
 
-    @method_decorator(cache_page(60 * 15))  #! Cache for 15 minutes
+    @method_decorator(never_cache)
     def retrieve(self, request, *args, **kwargs):
         logger.debug("ProductViewSet.retrieve called, checking cache")
-        response = super().retrieve(request, *args, **kwargs)
-        logger.debug("ProductViewSet.retrieve response generated")
-        return response
+        #* canonical form, the key must match what invalidate(instance.pk) deletes
+        try:
+            pk = uuid.UUID(str(kwargs["pk"]))
+        except ValueError:
+            raise Http404
+        content = cached_detail(
+            request,
+            pk,
+            lambda: render_product(self.get_object(), self.get_serializer_context()),
+        )
+        return HttpResponse(content, content_type="application/json")
+
+    #* prefix autocomplete on name, served by the trigram index on UPPER(name)
+    @action(detail=False, methods=["get"], url_path="autocomplete")
+    def autocomplete(self, request):
+        prefix = request.query_params.get("q", "").strip()
+        if not prefix:
+            return Response([])
+        products = (
+            Product.objects.filter(name__istartswith=prefix)
+            .order_by("name")
+            .values("id", "name")[:AUTOCOMPLETE_LIMIT]
+        )
+        return Response(list(products))
+
+    #* assembles the page from per-product JSON fragments instead of re-serializing
+    def render_list(self):
+        queryset = self.filter_queryset(self.get_queryset())
+        page = self.paginate_queryset(queryset)
+        results = render_products(
+            page if page is not None else queryset, self.get_serializer_context()
+        )
+        if page is None:
+            return results
+        return b'{"next":%s,"previous":%s,"results":%s}' % (
+            dumps(self.paginator.get_next_link()),
+            dumps(self.paginator.get_previous_link()),
+            results,
+        )
 
 
-class ProductSalesStatsView(APIView):
+class ProductSalesStatsView(ReplicaReadMixin, APIView):
     permission_classes = [IsAdminUser]
 
-    def get(self, request):
+    def get_date_range(self, request):
         month = request.query_params.get("month")
         if month:
-            try:
-                year, month = map(int, month.split("-"))
-                start_date = timezone.datetime(year, month, 1)
-                end_date = (start_date + timedelta(days=31)).replace(day=1) - timedelta(
-                    seconds=1
-                )
-            except ValueError:
-                return Response(
-                    {"error": "Invalid month format. Use YYYY-MM."}, status=400
-                )
+            year, month = map(int, month.split("-"))
+            start_date = date(year, month, 1)
+            end_date = (start_date + timedelta(days=31)).replace(day=1) - timedelta(
+                days=1
+            )
         else:
-            end_date = timezone.now()
+            end_date = timezone.localdate()
             start_date = end_date - timedelta(days=30)
+        return start_date, end_date
 
-        stats = (
-            OrderItem.objects.filter(
-                order__created_at__range=[start_date, end_date], order__is_paid=True
-            )
+    #* read the pre-aggregated daily rollup instead of scanning order items
+    def get_stats(self, start_date, end_date):
+        return (
+            ProductDailySales.objects.filter(date__range=[start_date, end_date])
+            .exclude(quantity=0)
             .values("product__id", "product__name")
             .annotate(
                 total_quantity=Sum("quantity"),
-                total_revenue=Sum(
-                    F("quantity")
-                    * Coalesce(F("product__special_price"), F("product__price"))
-                ),
+                total_revenue=Sum("revenue"),
             )
         )
 
+    def get(self, request):
+        try:
+            start_date, end_date = self.get_date_range(request)
+        except ValueError:
+            return Response({"error": "Invalid month format. Use YYYY-MM."}, status=400)
+
+        stats = self.get_stats(start_date, end_date)
+
         if not stats:
             return Response([])
 
         serializer = ProductSalesStatsSerializer(stats, many=True)
         return Response(serializer.data)
+
+
+#* streams the same per-product stats as ndjson or csv
+class ProductSalesStatsExportView(ProductSalesStatsView):
+    def get(self, request):
+        output = request.query_params.get("output", "ndjson")
+        if output not in EXPORT_FORMATS:
+            return Response({"error": "Invalid output. Use ndjson or csv."}, status=400)
+        try:
+            start_date, end_date = self.get_date_range(request)
+        except ValueError:
+            return Response({"error": "Invalid month format. Use YYYY-MM."}, status=400)
+
+        stats = self.get_stats(start_date, end_date)
+        rows = (
+            {
+                "product_id": row["product__id"],
+                "product_name": row["product__name"],
+                "total_quantity": row["total_quantity"],
+                "total_revenue": row["total_revenue"],
+            }
+            #* bound explicitly: the rows are read after the view has returned
+            for row in stats.using(self.read_alias).iterator(
+                chunk_size=EXPORT_CHUNK_SIZE
+            )
+        )
+        return stream_export(request, rows, STATS_CSV_FIELDS, output, "product-stats")
@@ -0,0 +1,93 @@
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.utils import get_md5_hash_password
+from users.models import User
+
+
+def _user_key(user_id, jti):
+    return f"auth:user:{user_id}:{jti}"
+
+
+def _generation_key(user_id):
+    return f"auth:user:{user_id}:generation"
+
+
+#* the only fields authentication and permission checks read; the rest of the
+#* user, the password hash included, never goes into the cache
+AUTH_USER_FIELDS = ["id", "is_active", "is_staff", "is_superuser"]
+
+
+#* deferred instance from the cached fields, any other field loads on access
+def _user_from_entry(entry):
+    user = User.from_db("default", AUTH_USER_FIELDS, entry["fields"])
+    user._password_md5 = entry["password_md5"]
+    return user
+
+
+#* user for a validated token, cached per (user id, jti) for a short TTL;
+#* entries are checked against a per-user generation fetched in the same MGET
+def get_user_for_token(token):
+    user_id = token[api_settings.USER_ID_CLAIM]
+    key = _user_key(user_id, token.get(api_settings.JTI_CLAIM))
+    generation_key = _generation_key(user_id)
+
+    cached = cache.get_many([key, generation_key])
+    generation = cached.get(generation_key, 0)
+    entry = cached.get(key)
+    if entry is not None and entry["generation"] == generation:
+        return _user_from_entry(entry)
+
+    user = User.objects.get(**{api_settings.USER_ID_FIELD: user_id})
+    user._password_md5 = get_md5_hash_password(user.password)
+    entry = {
+        "generation": generation,
+        "fields": [getattr(user, field) for field in AUTH_USER_FIELDS],
+        "password_md5": user._password_md5,
+    }
+    cache.set(key, entry, settings.AUTH_USER_CACHE_TIMEOUT)
+    return user
+
+
+#* O(1) invalidation of every cached token entry of a user
+def invalidate_user(user_id):
+    generation_key = _generation_key(user_id)
+    try:
+        cache.incr(generation_key)
+    except ValueError:
+        #* start from a timestamp so a lost key never revalidates old entries
+        cache.set(
+            generation_key,
+            int(time.time() * 1000),
+            timeout=settings.AUTH_USER_CACHE_TIMEOUT,
+        )
+
+
+#* JWTAuthentication that resolves the user through the shared user cache
+class CachedJWTAuthentication(JWTAuthentication):
+    def get_user(self, validated_token):
+        try:
+            user = get_user_for_token(validated_token)
+        except KeyError:
+            raise InvalidToken(_("Token contained no recognizable user identification"))
+        except User.DoesNotExist:
+            raise AuthenticationFailed(_("User not found"), code="user_not_found")
+
+        if api_settings.CHECK_USER_IS_ACTIVE and not user.is_active:
+            raise AuthenticationFailed(_("User is inactive"), code="user_inactive")
+
+        if api_settings.CHECK_REVOKE_TOKEN:
+            if (
+                validated_token.get(api_settings.REVOKE_TOKEN_CLAIM)
+                != user._password_md5
+            ):
+                raise AuthenticationFailed(
+                    _("The user's password has been changed."), code="password_changed"
+                )
+
+        return user
@@ -0,0 +1,88 @@
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+import django
+from django.conf import settings
+from django.contrib.auth.hashers import (
+    check_password,
+    get_hasher,
+    identify_hasher,
+    make_password,
+)
+
+import logging
+
+logger = logging.getLogger(__name__)
+
+_pool = None
+_pool_pid = None
+_pool_lock = threading.Lock()
+
+
+def _init_worker():
+    django.setup()
+
+
+#* spawned, not forked: children never inherit open DB/Redis connections
+def _get_pool():
+    global _pool, _pool_pid
+    with _pool_lock:
+        if _pool is None or _pool_pid != os.getpid():
+            _pool = ProcessPoolExecutor(
+                max_workers=settings.PASSWORD_HASHING_WORKERS,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_init_worker,
+            )
+            _pool_pid = os.getpid()
+            logger.info(
+                f"Password hashing pool started with "
+                f"{settings.PASSWORD_HASHING_WORKERS} workers"
+            )
+        return _pool
+
+
+#* a worker that dies (e.g. OOM-killed) breaks the whole executor for good
+def _drop_pool(pool):
+    global _pool
+    with _pool_lock:
+        if _pool is pool:
+            _pool = None
+    pool.shutdown(wait=False, cancel_futures=True)
+
+
+#* runs fn in a worker, once more on a fresh pool if the current one broke
+def _run(fn, *args):
+    pool = _get_pool()
+    try:
+        return pool.submit(fn, *args).result()
+    except BrokenProcessPool:
+        logger.error("Password hashing pool broken, starting a new one")
+        _drop_pool(pool)
+        return _get_pool().submit(fn, *args).result()
+
+
+def offloaded():
+    return settings.PASSWORD_HASHING_WORKERS > 0
+
+
+#* (valid, must_update), same rules as django.contrib.auth.hashers.check_password
+def _verify(raw_password, encoded):
+    if not check_password(raw_password, encoded):
+        return False, False
+    preferred = get_hasher("default")
+    hasher = identify_hasher(encoded)
+    return True, (
+        hasher.algorithm != preferred.algorithm or preferred.must_update(encoded)
+    )
+
+
+#* the calling thread waits while a worker process hashes
+def hash_password(raw_password):
+    return _run(make_password, raw_password)
+
+
+def verify_password(raw_password, encoded):
+    return _run(_verify, raw_password, encoded)
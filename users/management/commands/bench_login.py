@@ -0,0 +1,68 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.db import connection
+from django.core.management.base import BaseCommand
+from rest_framework.test import APIRequestFactory
+
+from users.models import User
+from users.sessions import release_session
+from users.views import CustomTokenObtainPairView
+
+BENCH_PHONE_PREFIX = "bench-"
+BENCH_PASSWORD = "bench-password"
+
+
+class Command(BaseCommand):
+    help = (
+        "Measure login throughput (logins/sec) of the token endpoint with "
+        "concurrent first logins of distinct users"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--users", type=int, default=200)
+        parser.add_argument("--concurrency", type=int, default=8)
+
+    def handle(self, *args, **options):
+        users = self.create_users(options["users"])
+        view = CustomTokenObtainPairView.as_view()
+        factory = APIRequestFactory()
+
+        def login(user):
+            request = factory.post(
+                "/api/token/",
+                {"phone": user.phone, "password": BENCH_PASSWORD},
+                format="json",
+            )
+            try:
+                return view(request).status_code
+            finally:
+                connection.close()
+
+        try:
+            started = time.perf_counter()
+            with ThreadPoolExecutor(options["concurrency"]) as pool:
+                statuses = list(pool.map(login, users))
+            elapsed = time.perf_counter() - started
+            failed = sum(status != 200 for status in statuses)
+            self.stdout.write(
+                f"{len(users)} logins in {elapsed:.2f}s, "
+                f"{len(users) / elapsed:.1f} logins/sec, {failed} failed"
+            )
+        finally:
+            for user in users:
+                release_session(user)
+            User.objects.filter(phone__startswith=BENCH_PHONE_PREFIX).delete()
+
+    #* one real hash, copied to every user so setup stays fast
+    def create_users(self, count):
+        template = User()
+        template.set_password(BENCH_PASSWORD)
+        return User.objects.bulk_create(
+            User(
+                phone=f"{BENCH_PHONE_PREFIX}{i}",
+                full_name="Login benchmark",
+                password=template.password,
+            )
+            for i in range(count)
+        )
@@ -0,0 +1,83 @@
+import asyncio
+import os
+import time
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.auth.hashers import check_password, make_password
+from django.core.management.base import BaseCommand
+from django.test import override_settings
+
+from users import hashing
+
+BENCH_PASSWORD = "bench-password"
+HASHERS = {
+    "argon2": "users.hashers.TunedArgon2PasswordHasher",
+    "scrypt": "users.hashers.TunedScryptPasswordHasher",
+    "pbkdf2": "django.contrib.auth.hashers.PBKDF2PasswordHasher",
+}
+
+
+class Command(BaseCommand):
+    help = (
+        "Measure password checks/sec per core and event loop lag for each hasher, "
+        "hashing in request threads against the hashing process pool"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--hashers", nargs="+", default=list(HASHERS))
+        parser.add_argument("--requests", type=int, default=100)
+        parser.add_argument("--concurrency", type=int, default=16)
+        parser.add_argument(
+            "--workers", type=int, default=os.cpu_count(), help="Pool processes"
+        )
+
+    def handle(self, *args, **options):
+        cores = os.cpu_count()
+        for name in options["hashers"]:
+            hashers = [HASHERS[name]] + list(settings.PASSWORD_HASHERS)
+            with override_settings(PASSWORD_HASHERS=hashers):
+                encoded = make_password(BENCH_PASSWORD)
+                for mode in ("thread", "process"):
+                    workers = options["workers"] if mode == "process" else 0
+                    with override_settings(PASSWORD_HASHING_WORKERS=workers):
+                        elapsed, lag = asyncio.run(self.run(mode, encoded, options))
+                    rate = options["requests"] / elapsed
+                    self.stdout.write(
+                        f"{name:>6} {mode:>7}: {rate:.1f} checks/sec, "
+                        f"{rate / cores:.1f} per core, max loop lag {lag * 1000:.0f}ms"
+                    )
+
+    async def run(self, mode, encoded, options):
+        semaphore = asyncio.Semaphore(options["concurrency"])
+        #* both run in request threads like the sync login view under ASGI; in
+        #* process mode the thread only waits on the pool
+        if mode == "process":
+            verify = sync_to_async(hashing.verify_password, thread_sensitive=False)
+            #* start the workers before timing
+            await verify(BENCH_PASSWORD, encoded)
+        else:
+            verify = sync_to_async(check_password, thread_sensitive=False)
+
+        async def check():
+            async with semaphore:
+                await verify(BENCH_PASSWORD, encoded)
+
+        #* how late a 10ms timer fires while the checks run
+        lag = 0
+        done = asyncio.Event()
+
+        async def probe():
+            nonlocal lag
+            while not done.is_set():
+                started = time.perf_counter()
+                await asyncio.sleep(0.01)
+                lag = max(lag, time.perf_counter() - started - 0.01)
+
+        probe_task = asyncio.create_task(probe())
+        started = time.perf_counter()
+        await asyncio.gather(*(check() for _ in range(options["requests"])))
+        elapsed = time.perf_counter() - started
+        done.set()
+        await probe_task
+        return elapsed, lag
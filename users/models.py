@@ -6,6 +6,7 @@ from django.contrib.auth.models import (
 from django.db import models
 from django.utils import timezone
 import uuid
+from users import hashing
 
 
 class UserManager(BaseUserManager):
@@ -37,6 +38,29 @@ class User(AbstractBaseUser, PermissionsMixin):
     objects = UserManager()
     USERNAME_FIELD = "phone"
 
+    class Meta:
+        indexes = [
+            models.Index(fields=["-created_at", "-id"], name="user_created_idx"),
+        ]
+
+    #* with PASSWORD_HASHING_WORKERS set, hashing runs in the worker processes
+    def set_password(self, raw_password):
+        if not hashing.offloaded():
+            return super().set_password(raw_password)
+        self.password = hashing.hash_password(raw_password)
+        self._password = raw_password
+
+    #* outdated hashes are upgraded through the setter, like Django does
+    def check_password(self, raw_password):
+        if not hashing.offloaded():
+            return super().check_password(raw_password)
+        valid, must_update = hashing.verify_password(raw_password, self.password)
+        if must_update:
+            self.set_password(raw_password)
+            self._password = None
+            self.save(update_fields=["password"])
+        return valid
+
 
 class UserSession(models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name="sessions")
@@ -0,0 +1,66 @@
+import uuid
+
+from django.core.cache import cache
+from django.db import transaction
+
+from users.models import User, UserSession
+
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+def _session_key(user_id):
+    return f"auth:session:{user_id}"
+
+
+#* single-device login: claims the user's one session slot, returns the new
+#* session key or None when another device holds it. A slot held in Redis is
+#* rejected without touching the database; on a miss (or with Redis down) the
+#* database decides
+def claim_session(user):
+    try:
+        if cache.get(_session_key(user.pk)) is not None:
+            return None
+    except Exception as e:
+        logger.warning("Session cache unavailable, using the database: %s", e)
+    return _claim_session_db(user, str(uuid.uuid4()))
+
+
+#* the user row lock serializes claims and releases; the slot is written back to
+#* Redis from the database, so sessions from before a deploy, a Redis flush or a
+#* database-only login are enforced again
+def _claim_session_db(user, session_key):
+    with transaction.atomic():
+        User.objects.select_for_update().filter(pk=user.pk).exists()
+        current = (
+            UserSession.objects.filter(user=user)
+            .values_list("session_key", flat=True)
+            .first()
+        )
+        if current is None:
+            UserSession.objects.create(user=user, session_key=session_key)
+        _seed_session(user, current or session_key)
+    return None if current else session_key
+
+
+def _seed_session(user, session_key):
+    try:
+        cache.set(_session_key(user.pk), session_key, timeout=None)
+    except Exception as e:
+        logger.warning("Session cache unavailable, slot not cached: %s", e)
+
+
+#* frees the slot again (logout), returns the number of deleted session rows;
+#* under the user row lock so a concurrent claim cannot re-seed the old slot
+def release_session(user):
+    with transaction.atomic():
+        User.objects.select_for_update().filter(pk=user.pk).exists()
+        deleted = UserSession.objects.filter(user=user).delete()[0]
+        try:
+            cache.delete(_session_key(user.pk))
+        except Exception as e:
+            logger.warning(
+                "Session cache unavailable, clearing the database only: %s", e
+            )
+    return deleted
@@ -2,6 +2,7 @@ from rest_framework import generics
 from rest_framework.views import APIView
 from rest_framework.permissions import AllowAny, IsAuthenticated
 from .permissions import IsSuperUser
+from config.db_router import ReplicaReadMixin
 from users.models import User
 from django.views.decorators.cache import never_cache
 from django.utils.decorators import method_decorator
@@ -14,8 +15,9 @@ from .serializers import (
 from rest_framework import status
 from rest_framework.response import Response
 from rest_framework_simplejwt.views import TokenObtainPairView
-from users.models import UserSession
-import uuid
+from rest_framework_simplejwt.tokens import RefreshToken
+from users.authentication import invalidate_user
+from users.sessions import claim_session, release_session
 import logging
 
 logger = logging.getLogger(__name__)
@@ -31,12 +33,13 @@ class MeView(generics.RetrieveUpdateAPIView):
     serializer_class = MeSerializer
     permission_classes = [IsAuthenticated]
 
+    #* request.user only carries the cached auth fields, load the full profile
     def get_object(self):
-        return self.request.user
+        return User.objects.get(pk=self.request.user.pk)
 
 
 @method_decorator(never_cache, name="dispatch")
-class UserListView(generics.ListAPIView):
+class UserListView(ReplicaReadMixin, generics.ListAPIView):
     serializer_class = UserListSerializer
     permission_classes = [IsSuperUser]
 
@@ -88,76 +91,44 @@ class UserDeleteView(generics.DestroyAPIView):
             )
 
 
+#* one user query, one password check and one atomic session claim per login;
+#* the request data (password included) is never logged
 class CustomTokenObtainPairView(TokenObtainPairView):
     def post(self, request, *args, **kwargs):
-        logger.info("CustomTokenObtainPairView: Starting login attempt")
-        logger.info(f"Request data: {request.data}")
         phone = request.data.get("phone")
+        password = request.data.get("password")
         if not phone:
             logger.error("No phone provided in login request")
             return Response(
                 {"error": "Phone is required"}, status=status.HTTP_400_BAD_REQUEST
             )
-        logger.info(f"Phone provided: {phone}")
 
-        # check if user exists
         try:
             user = User.objects.get(phone=phone)
-            logger.info(f"User found: {user.phone} (ID: {user.id})")
         except User.DoesNotExist:
-            logger.error(f"User with phone {phone} not found")
+            #* hash anyway so unknown phones take as long as wrong passwords
+            User().set_password(password)
+            user = None
+        if user is None or not user.check_password(password) or not user.is_active:
+            logger.info("Login failed for %s", phone)
             return Response(
                 {"error": "Invalid credentials"}, status=status.HTTP_401_UNAUTHORIZED
             )
 
-        # check if user has active sessions
-        existing_sessions = UserSession.objects.filter(user=user)
-        if existing_sessions.exists():
-            logger.warning(
-                f"User {phone} already has active sessions: {existing_sessions}"
-            )
+        session_key = claim_session(user)
+        if session_key is None:
+            logger.warning("User %s already has an active session", phone)
             return Response(
                 {"error": "This account is already logged in on another device"},
                 status=status.HTTP_403_FORBIDDEN,
             )
-        logger.info(f"No active sessions for {phone}")
 
-        # generate tokens
-        logger.info("Attempting to generate tokens")
-        try:
-            response = super().post(request, *args, **kwargs)
-            logger.info(
-                f"Token generation response: status={response.status_code}, data={response.data}"
-            )
-        except Exception as e:
-            logger.error(f"Token generation failed: {str(e)}")
-            return Response(
-                {"error": "Invalid credentials"}, status=status.HTTP_401_UNAUTHORIZED
-            )
-
-        # check if response is successful
-        if response.status_code == 200:
-            logger.info("Login successful, creating UserSession")
-            session_key = str(uuid.uuid4())
-            try:
-                session = UserSession.objects.create(user=user, session_key=session_key)
-                logger.info(
-                    f"Created UserSession for {phone} with session_key {session_key} (ID: {session.id})"
-                )
-            except Exception as e:
-                logger.error(f"Failed to create UserSession: {str(e)}")
-                return Response(
-                    {"error": "Failed to create session"},
-                    status=status.HTTP_500_INTERNAL_SERVER_ERROR,
-                )
-        else:
-            logger.error(
-                f"Login failed: status={response.status_code}, data={response.data}"
-            )
-            return response
-
-        logger.info("Login completed successfully")
-        return response
+        refresh = RefreshToken.for_user(user)
+        logger.info("Login successful for %s", phone)
+        return Response(
+            {"refresh": str(refresh), "access": str(refresh.access_token)},
+            status=status.HTTP_200_OK,
+        )
 
 
 class LogoutView(APIView):
@@ -165,7 +136,8 @@ class LogoutView(APIView):
 
     def post(self, request):
         logger.info(f"Logout attempt for user: {request.user.phone}")
-        deleted_count = UserSession.objects.filter(user=request.user).delete()[0]
+        deleted_count = release_session(request.user)
+        invalidate_user(request.user.pk)
         logger.info(f"Deleted {deleted_count} sessions for user: {request.user.phone}")
         return Response(
             {"message": "Logged out successfully"}, status=status.HTTP_200_OK